@@ -8,18 +8,22 @@ Email: quantumudit@gmail.com
 The code is a Streamlit application that allows users to select a category, subject, and topic,
 and then scrape ebook data from the eBooks.com website.
 It retrieves the data based on the user's selections and
-generates a downloadable CSV file containing the ebook information.
+generates a downloadable CSV, Parquet or Arrow file containing the ebook information.
 """
 
 # Import necessary libraries
+import os
+import tempfile
 import time
-from datetime import datetime
+import uuid
 
-import pandas as pd
 import streamlit as st
 from PIL import Image
 
+import export_util as eu
 import scraper_util as su
+from job_util import JobManager
+from network_util import ResponseCache
 
 # Configure the Streamlit page
 st.set_page_config(
@@ -30,21 +34,47 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Define paths for images
-logo_image = Image.open("./images/ebooks_logo.png")
-books_image = Image.open("./images/books_image.jpg")
-
-# Get the dimensions of the logo_image
-original_width, original_height = logo_image.size
+# Keep API responses on disk so re-runs over a subject only revalidate unchanged pages
+if su.get_client().response_cache is None:
+    su.get_client().response_cache = ResponseCache(
+        os.path.join(tempfile.gettempdir(), "ebooks_response_cache.sqlite"))
 
 # Define the new width for the logo
 NEW_WIDTH = 700
 
-# Calculate the new height to maintain the aspect ratio
-new_height = int((NEW_WIDTH / original_width) * original_height)
+
+@st.cache_resource
+def load_images():
+    """Load the images and resize the logo once, instead of on every rerun."""
+    logo_image = Image.open("./images/ebooks_logo.png")
+    books_image = Image.open("./images/books_image.jpg")
+
+    # Calculate the new height to maintain the aspect ratio of the logo
+    original_width, original_height = logo_image.size
+    new_height = int((NEW_WIDTH / original_width) * original_height)
+    return logo_image.resize((NEW_WIDTH, new_height)), books_image
+
+
+new_logo_image, books_image = load_images()
+
+
+@st.cache_resource
+def get_job_manager():
+    """Start the background crawl workers once per server, shared by every session."""
+    return JobManager(os.path.join(tempfile.gettempdir(), "ebooks_jobs"))
+
+
+job_manager = get_job_manager()
+
+# Identify the session through the URL, so its jobs can be found again after a
+# reconnect and are shared fairly with other users
+query_params = st.experimental_get_query_params()
+session_id = query_params.get("session", [None])[0]
+if session_id is None:
+    session_id = uuid.uuid4().hex
+    st.experimental_set_query_params(session=session_id)
 
 # Display the resized logo
-new_logo_image = logo_image.resize((NEW_WIDTH, new_height))
 st.image(new_logo_image, use_column_width=False)
 
 # Create two columns for layout
@@ -66,30 +96,22 @@ with col1:
 
 # Populate col2 with interactive elements
 with col2:
-    # Retrieve subject details for the available categories
-    subject_details = su.get_category_subjects()
-    all_subjects_dict = {
-        sub_name: sub_id for d in subject_details for sub_name, sub_id in d.items()}
+    # Retrieve the category/subject tree with a single menu request
+    subject_menu = su.load_subject_menu()
+    all_subjects_dict = subject_menu.subject_ids
 
     # User selects a category
     category_select = st.selectbox(
         'Choose a Category:',
-        ('Popular Subjects', 'Fiction', 'Non-Fiction')
+        tuple(subject_menu.categories.keys())
     )
 
     # User selects a subject based on the chosen category
-    if category_select == "Popular Subjects":
-        subject_select = st.selectbox(
-            "Choose a Subject:", tuple(subject_details[0].keys()))
-    elif category_select == "Fiction":
-        subject_select = st.selectbox(
-            "Choose a Subject:", tuple(subject_details[1].keys()))
-    else:
-        subject_select = st.selectbox(
-            "Choose a Subject:", tuple(subject_details[2].keys()))
+    subject_select = st.selectbox(
+        "Choose a Subject:", tuple(subject_menu.subjects(category_select).keys()))
 
     # Retrieve topics for the selected subject
-    topics_details = su.get_topics_for_subject(
+    topics_details = subject_menu.topics_for(
         subject_id=all_subjects_dict.get(subject_select))
 
     # User selects a topic (if available) based on the selected subject
@@ -97,6 +119,25 @@ with col2:
         "Choose a Topic:",
         tuple(topics_details.keys()))
 
+    # User selects the export format of the data
+    format_select = st.selectbox(
+        "Choose a File Format:",
+        tuple(eu.EXPORT_FORMATS.keys()),
+        format_func=str.upper)
+
+    # User chooses whether to extract every topic of the category in one run
+    whole_category = st.checkbox("Extract every topic of the category")
+
+    # User chooses whether to only collect books not extracted before
+    new_books_only = st.checkbox("Only new or changed books since the last such run")
+
+    # User may stop paging once the newest-first listing only shows known books
+    stop_after_known_pages = None
+    if new_books_only:
+        stop_after_known_pages = st.number_input(
+            "Stop after this many pages without new books (0 to check every page)",
+            min_value=0, value=0, step=1) or None
+
     # Create a button to initiate data extraction
     submit = st.button("Get Data")
 
@@ -107,54 +148,52 @@ with col2:
         else:
             topic_id = topics_details.get(topic_select)
 
-        # Initialize page number and an empty list for book details
-        PAGE_NUM = 1
-        all_books_details = []
-
-        # Get the total number of books available for the topic
-        total_books_available = su.fetch_total_books_count(subject_id=topic_id)
-
-        # Create a progress bar for data extraction
-        PROGRESS_TEXT = "Operation in progress. Please wait..."
-        my_bar = st.progress(0, text=PROGRESS_TEXT)
-
-        while True:
-            books_data = su.fetch_books_data(
-                page_num=PAGE_NUM, subject_id=topic_id)
-            if books_data is not None and len(books_data) > 0:
-                for book in books_data:
-                    details = su.parse_books_details(book)
-                    details["scrape_timestamp"] = datetime.now().strftime(
-                        "%Y-%m-%d %H:%M:%S")
-                    all_books_details.append(details)
-
-                time.sleep(1)
-
-                PAGE_NUM += 1
-
-                progress_pct = int(
-                    (len(all_books_details) / total_books_available) * 100)
-
-                my_bar.progress(
-                    min(progress_pct, 100),
-                    text=(
-                        f"Books Collected: {len(all_books_details)} "
-                        f"out of {total_books_available} | {progress_pct}%"
-                    )
-                )
-            else:
-                break
-
-        # Generate a CSV file for user download
-        if len(all_books_details) == 0:
-            st.write("No books available to collect")
+        # Determine the IDs to crawl (topics listed under several subjects are crawled once)
+        if whole_category:
+            crawl_ids = subject_menu.category_topic_ids(category_select)
         else:
-            books_df = pd.DataFrame(all_books_details)
-            BOOKS_DATA_CSV = books_df.to_csv(index=False, encoding='utf-8')
-
-            st.download_button(
-                label="Download Data as CSV",
-                data=BOOKS_DATA_CSV,
-                file_name="books_data.csv",
-                mime="text/csv"
+            crawl_ids = [topic_id]
+
+        # Queue the crawl in the background; it keeps running across reruns
+        job_manager.submit(session_id, crawl_ids, format_select, new_books_only=new_books_only,
+                           stop_after_known_pages=stop_after_known_pages)
+
+    # Show the progress of the session's jobs and serve their files once complete
+    session_jobs = job_manager.jobs_for(session_id)
+    for job in reversed(session_jobs):
+        export_format = eu.EXPORT_FORMATS[job.fmt]
+        st.progress(
+            job.progress,
+            text=(
+                f"{job.status.capitalize()} | Books Collected: {job.books_seen} "
+                f"out of {job.total_books} | {int(job.progress * 100)}%"
             )
+        )
+        if job.status == "succeeded":
+            if job.rows_written == 0:
+                st.write("No new books available to collect" if job.new_books_only
+                         else "No books available to collect")
+            else:
+                with open(job.output_path, "rb") as export_file:
+                    st.download_button(
+                        label=f"Download Data as {job.fmt.upper()}",
+                        data=export_file,
+                        file_name=f"books_data.{export_format['extension']}",
+                        mime=export_format["mime"],
+                        key=f"download-{job.job_id}"
+                    )
+        elif job.status == "failed":
+            st.error("The extraction failed. Please retry; it resumes where it stopped.")
+            st.button("Retry", key=f"retry-{job.job_id}",
+                      on_click=job_manager.retry, args=(job.job_id,))
+        elif not job.finished:
+            st.button("Cancel", key=f"cancel-{job.job_id}",
+                      on_click=job_manager.cancel, args=(job.job_id,))
+        if job.finished:
+            st.button("Dismiss", key=f"dismiss-{job.job_id}",
+                      on_click=job_manager.remove, args=(job.job_id,))
+
+    # Poll the running jobs until they finish
+    if any(not job.finished for job in session_jobs):
+        time.sleep(1)
+        st.rerun()
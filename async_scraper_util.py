@@ -0,0 +1,428 @@
+"""
+Async Data Scraping Utility Functions
+=====================================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+=====================================
+
+This module provides asyncio-native counterparts of the fetch functions in
+`scraper_util`, built on a pooled `httpx.AsyncClient`. Parsing is shared with
+`scraper_util`, so the records produced are identical to the blocking API.
+
+Classes:
+--------
+1. AsyncEbooksClient: Pooled, keep-alive async HTTP client for the Ebooks API.
+
+Functions:
+----------
+1. get_category_subjects(): Retrieve category subjects from the Ebooks API.
+2. get_topics_for_subject(): Retrieve topics for a given subject ID.
+3. fetch_total_books_count(): Retrieve the total number of books for a subject.
+4. fetch_books_data(): Retrieve books data for a page and subject.
+5. fetch_books_page(): Retrieve a page of books together with the result metadata.
+6. load_subject_menu(): Load the category/subject/topic tree with one request.
+7. fetch_subject_menu(): Retrieve a subject menu response through the menu cache.
+8. iter_books(): Yield parsed book records of a subject as pages arrive.
+9. check_response(): Raise for an error status of a response.
+"""
+
+
+import asyncio
+import itertools
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+import scraper_util as su
+from json_util import get_json_decoder
+from network_util import (RETRYABLE_STATUS_CODES, BackoffPolicy, CircuitBreaker, RateLimiter,
+                          ResponseCache, RetryableStatusError, RetryPolicy, UserAgentProvider,
+                          parse_retry_after, response_cache_key)
+
+# Ordered most specific first: RetryPolicy uses the first matching error class
+DEFAULT_RETRY_POLICIES = {
+    RetryableStatusError: BackoffPolicy(max_attempts=6, initial_delay=1.0, max_delay=60.0),
+    httpx.TimeoutException: BackoffPolicy(max_attempts=4, initial_delay=1.0, max_delay=30.0),
+    httpx.TransportError: BackoffPolicy(max_attempts=5, initial_delay=0.5, max_delay=30.0),
+    ValueError: BackoffPolicy(max_attempts=3, initial_delay=1.0, max_delay=10.0),
+}
+
+
+class AsyncEbooksClient:
+    """
+    A pooled async HTTP client for the Ebooks API.
+
+    The client must be used from a single event loop; create one per loop and
+    share it between coroutines, ideally with `async with`.
+
+    Attributes:
+    -----------
+    client: The underlying `httpx.AsyncClient`.
+    user_agents: The provider of the per-request User-Agent header.
+    retry_policy: The retry layer wrapped around every request.
+    response_cache: The persistent cache of decoded JSON responses, if any.
+    """
+
+    def __init__(
+        self,
+        base_url: str = su.WEBSITE_URL,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        timeout: float = 100,
+        user_agents: Optional[UserAgentProvider] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        """
+        Args:
+            base_url (str): The root URL of the API (override to target a local server).
+            max_connections (int): The maximum number of concurrent connections.
+            max_keepalive_connections (int): The number of idle connections kept alive.
+            timeout (float): The per-request timeout in seconds.
+            user_agents (Optional[UserAgentProvider]): The user-agent provider;
+                defaults to round-robin over the bundled list.
+            retry_policy (Optional[RetryPolicy]): The retry layer; defaults to
+                `DEFAULT_RETRY_POLICIES` behind a circuit breaker. Pass a policy
+                without error classes to disable retries.
+            response_cache (Optional[ResponseCache]): The cache consulted by
+                `get_json()`; `None` always downloads.
+        """
+        self.response_cache = response_cache
+        self.user_agents = user_agents if user_agents is not None else UserAgentProvider()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(
+            DEFAULT_RETRY_POLICIES, circuit_breaker=CircuitBreaker())
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"accept-language": "en-US"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections),
+            timeout=timeout)
+
+    async def send(self, endpoint: str, params: List[Tuple[str, str]],
+                   rate_limiter: Optional[RateLimiter] = None,
+                   headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Send a single GET request to an API endpoint.
+
+        Args:
+            endpoint (str): The endpoint path relative to the base URL.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter pacing the request;
+                its outcome is fed back into the limiter.
+            headers (Optional[Dict[str, str]]): Extra request headers, e.g.
+                conditional request validators.
+
+        Returns:
+            httpx.Response: The successful (or 304 Not Modified) response.
+
+        Raises:
+            RetryableStatusError: If the status is one of `RETRYABLE_STATUS_CODES`.
+            httpx.HTTPStatusError: If the status is any other error status.
+        """
+        headers = {**(headers or {}), "User-Agent": self.user_agents.get()}
+        if rate_limiter is None:
+            response = await self.client.get(endpoint, params=params, headers=headers)
+            return check_response(response)
+
+        host = self.client.base_url.host
+        await asyncio.sleep(rate_limiter.reserve(host))
+        started = time.monotonic()
+        try:
+            response = await self.client.get(endpoint, params=params, headers=headers)
+        except httpx.HTTPError:
+            rate_limiter.record(host, None, time.monotonic() - started)
+            raise
+        rate_limiter.record(
+            host, response.status_code, time.monotonic() - started,
+            parse_retry_after(response.headers.get("Retry-After")))
+        return check_response(response)
+
+    async def get_json(self, endpoint: str, params: List[Tuple[str, str]],
+                       rate_limiter: Optional[RateLimiter] = None,
+                       decode: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """
+        Send a GET request to an API endpoint and decode the JSON body,
+        retrying both per `retry_policy`.
+
+        With a response cache, a fresh entry is returned without a request
+        and a stale one is revalidated with a conditional request.
+
+        Args:
+            endpoint (str): The endpoint path relative to the base URL.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter pacing the request;
+                its outcome is fed back into the limiter.
+            decode (Optional[Callable[[bytes], Any]]): The decoder of the body,
+                e.g. a schema-driven one; defaults to `get_json_decoder().loads`.
+
+        Returns:
+            Any: The decoded JSON payload.
+        """
+        return (await self.get_dated(endpoint, params, rate_limiter, decode))[0]
+
+    async def get_dated(self, endpoint: str, params: List[Tuple[str, str]],
+                        rate_limiter: Optional[RateLimiter] = None,
+                        decode: Optional[Callable[[bytes], Any]] = None) -> Tuple[Any, datetime]:
+        """
+        Send a GET request to an API endpoint and decode the body as `get_json()`
+        does, together with the time the body was fetched.
+
+        A body served fresh from the response cache is dated by when it was
+        stored (or last revalidated). The cache is a blocking SQLite store, so
+        it is only accessed from worker threads.
+
+        Args:
+            endpoint (str): The endpoint path relative to the base URL.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter pacing the request.
+            decode (Optional[Callable[[bytes], Any]]): The decoder of the body;
+                defaults to `get_json_decoder().loads`.
+
+        Returns:
+            Tuple[Any, datetime]: The decoded body and its fetch time.
+        """
+        if decode is None:
+            decode = get_json_decoder().loads
+        cache = self.response_cache
+        key = response_cache_key(endpoint, params)
+        cached = await asyncio.to_thread(cache.get, key) if cache is not None else None
+        if cached is not None and cached.fresh:
+            return decode(cached.body.encode("utf-8")), datetime.fromtimestamp(cached.stored_at)
+
+        async def attempt() -> Tuple[Any, datetime]:
+            response = await self.send(endpoint, params, rate_limiter,
+                                       cached.validators() if cached is not None else None)
+            fetched_at = datetime.now()
+            if response.status_code == 304 and cached is not None:
+                await asyncio.to_thread(cache.revalidated, key)
+                return decode(cached.body.encode("utf-8")), fetched_at
+            payload = decode(response.content)
+            if cache is not None:
+                await asyncio.to_thread(
+                    cache.put, key, response.text, response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"))
+            return payload, fetched_at
+
+        return await self.retry_policy.acall(attempt)
+
+    async def aclose(self) -> None:
+        """Close the underlying client and release its pooled connections."""
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncEbooksClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+def check_response(response: httpx.Response) -> httpx.Response:
+    """
+    Raise for an error status of a response.
+
+    Args:
+        response (httpx.Response): The response to check.
+
+    Returns:
+        httpx.Response: The response, if its status is not an error (304 included).
+
+    Raises:
+        RetryableStatusError: If the status is one of `RETRYABLE_STATUS_CODES`.
+        httpx.HTTPStatusError: If the status is any other error status.
+    """
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        raise RetryableStatusError(
+            response.status_code, str(response.url),
+            parse_retry_after(response.headers.get("Retry-After")))
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+
+async def get_category_subjects(client: AsyncEbooksClient) -> List[Dict[str, int]]:
+    """
+    Retrieve the category subjects from the Ebooks API.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the request with.
+
+    Returns:
+        A list of dictionaries containing the category subjects.
+        Each dictionary contains the subject name as the key
+        and the subject ID as the value.
+    """
+    menu = await load_subject_menu(client)
+    return list(menu.categories.values())
+
+
+async def load_subject_menu(
+        client: AsyncEbooksClient, include_topics: bool = False) -> su.SubjectMenu:
+    """
+    Load the category/subject tree from a single root menu request.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the requests with.
+        include_topics (bool): Whether to eagerly load the topics of every subject.
+
+    Returns:
+        su.SubjectMenu: The indexed category/subject/topic tree.
+    """
+    menu = su.parse_subject_menu(await fetch_subject_menu(client, su.ROOT_SUBJECT_ID))
+    if include_topics:
+        subject_ids = list(set(menu.subject_ids.values()))
+        all_topics = await asyncio.gather(
+            *(get_topics_for_subject(client, subject_id) for subject_id in subject_ids))
+        menu.topics.update(zip(subject_ids, all_topics))
+    return menu
+
+
+async def fetch_subject_menu(client: AsyncEbooksClient, subject_id: int) -> Dict[str, Any]:
+    """
+    Retrieve the subject menu response for a subject, through the shared menu cache.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the request with.
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        Dict[str, Any]: The decoded subject menu response.
+    """
+    cache = su.get_menu_cache()
+    key = su.menu_cache_key(subject_id)
+    payload = cache.get(key) if cache is not None else None
+    if payload is None:
+        payload = await client.get_json(su.SUBJECT_MENU_ENDPOINT, su.menu_params(subject_id))
+        if cache is not None:
+            cache.put(key, payload)
+    return payload
+
+
+async def get_topics_for_subject(
+        client: AsyncEbooksClient, subject_id: int) -> Dict[str, int]:
+    """
+    Retrieve the topics for a given subject ID from the Ebooks API.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the request with.
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        Dict[str, int]: A dictionary containing the topics.
+        Each topic name is a key and the corresponding topic ID is the value.
+    """
+    payload = await fetch_subject_menu(client, subject_id)
+    subject_menu = payload.get("subject_menus")
+    return {entry["subject_name"]: entry["id"]
+            for entry in subject_menu[0]["subject_menu_entries"]}
+
+
+async def fetch_total_books_count(client: AsyncEbooksClient, subject_id: int) -> int:
+    """
+    Retrieve the total number of books present for a given subject ID from the Ebooks API.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the request with.
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        int: The total number of books present.
+    """
+    books_page = await fetch_books_page(client, 1, subject_id)
+    return books_page.total_results
+
+
+async def fetch_books_data(
+        client: AsyncEbooksClient, page_num: int, subject_id: int) -> Optional[List[Dict]]:
+    """
+    Retrieve the books data for a given page number and subject ID from the Ebooks API.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the request with.
+        page_num (int): The page number of the books data to retrieve.
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        Optional[List[Dict]]: A list of dictionaries containing the raw books data,
+        e.g. for `su.parse_books_details()`. Returns `None` if no books data is found.
+    """
+    payload = await client.get_json(
+        su.SUBJECT_SEARCH_ENDPOINT, su.search_params(page_num, subject_id))
+    books_data = payload.get("books") if isinstance(payload, dict) else None
+    return books_data or None
+
+
+async def fetch_books_page(
+        client: AsyncEbooksClient, page_num: int, subject_id: int,
+        rate_limiter: Optional[RateLimiter] = None) -> su.BooksPage:
+    """
+    Retrieve one page of books for a subject together with the result metadata.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the request with.
+        page_num (int): The page number of the books data to retrieve.
+        subject_id (int): The ID of the subject.
+        rate_limiter (Optional[RateLimiter]): The limiter pacing the request.
+
+    Returns:
+        su.BooksPage: The parsed books and the total results of the subject.
+    """
+    (books, total_results), fetched_at = await client.get_dated(
+        su.SUBJECT_SEARCH_ENDPOINT, su.search_params(page_num, subject_id), rate_limiter,
+        su.decode_book_records)
+    return su.BooksPage(subject_id=subject_id, page_num=page_num, books=books,
+                        total_results=total_results, page_size=len(books), fetched_at=fetched_at)
+
+
+async def iter_books(
+    client: AsyncEbooksClient,
+    subject_id: int,
+    concurrency: int = su.DEFAULT_MAX_WORKERS,
+    requests_per_second: float = su.DEFAULT_REQUESTS_PER_SECOND,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield the parsed book records of a subject as their pages arrive.
+
+    Pages after the first are requested concurrently, so records are yielded
+    in completion order rather than page order. At most `concurrency` pages
+    are requested ahead of the records being yielded, so memory stays bounded
+    however slow the consumer is.
+
+    Args:
+        client (AsyncEbooksClient): The client to send the requests with.
+        subject_id (int): The ID of the subject.
+        concurrency (int): The maximum number of requests in flight.
+        requests_per_second (float): The request rate budget for the crawl.
+
+    Yields:
+        Dict[str, Any]: The parsed details of one book, with `scrape_timestamp`
+        set to the fetch time of its page.
+    """
+    limiter = RateLimiter(requests_per_second)
+    first_page = await fetch_books_page(client, 1, subject_id, limiter)
+    if not first_page.books:
+        return
+    for book in first_page.books:
+        yield dict(su.book_record_to_dict(book), scrape_timestamp=first_page.fetched_at)
+
+    page_numbers = iter(range(2, first_page.total_pages + 1))
+    pending: Set["asyncio.Future[su.BooksPage]"] = set()
+    try:
+        while True:
+            # Top the window up only once the consumer took the previous pages
+            for page_num in itertools.islice(page_numbers, concurrency - len(pending)):
+                pending.add(asyncio.ensure_future(
+                    fetch_books_page(client, page_num, subject_id, limiter)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                books_page = task.result()
+                for book in books_page.books:
+                    yield dict(su.book_record_to_dict(book),
+                               scrape_timestamp=books_page.fetched_at)
+    finally:
+        for task in pending:
+            task.cancel()
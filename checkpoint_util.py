@@ -0,0 +1,416 @@
+"""
+Crawl Checkpoint Utility Functions
+==================================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+==================================
+
+This module provides the on-disk state kept between crawls: a checkpoint of
+the pages a crawl has completed, so a crawl that fails midway can resume where
+it stopped, and an index of the books already extracted, so a refresh only
+emits the books that are new or changed.
+
+Classes:
+--------
+1. CrawlCheckpoint: SQLite store of the completed pages of subject crawls.
+2. SeenBooksIndex: SQLite index of the books already extracted per subject.
+3. DeferredSeenBooks: View of a `SeenBooksIndex` holding its marks back until committed.
+
+Functions:
+----------
+1. book_content_hash(): Hash the parsed details of a book to detect changes.
+"""
+
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from scraper_util import BOOK_FIELDS, Book, BooksPage, book_record_to_dict
+
+DEFAULT_CHECKPOINT_MAX_AGE = 24 * 3600
+
+_PAGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint_pages (
+    subject_id INTEGER NOT NULL,
+    page_num INTEGER NOT NULL,
+    total_results INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    books TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (subject_id, page_num)
+)
+"""
+
+_SEEN_BOOKS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_books (
+    subject_id INTEGER NOT NULL,
+    book_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (subject_id, book_id)
+)
+"""
+
+
+def book_content_hash(book: Any) -> str:
+    """
+    Hash the parsed details of a book.
+
+    Args:
+        book (Any): A record with the attributes of `Book`, e.g. from `BooksPage.books`.
+
+    Returns:
+        str: The hex digest of the book's content.
+    """
+    content = json.dumps([getattr(book, name) for name in BOOK_FIELDS], separators=(",", ":"))
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CrawlCheckpoint:
+    """
+    A thread-safe SQLite store of the pages completed by subject crawls.
+
+    Each page is stored with its parsed books and result metadata, so a
+    resumed crawl yields the same `BooksPage` it would have fetched, with its
+    books loaded as `Book` records. Pages
+    are committed one by one as they are saved, hence a crash loses at most
+    the page being written.
+
+    Pages older than `max_age` are ignored and pruned, and `discard_stale()`
+    drops the pages of a subject whose result count no longer matches a
+    freshly fetched first page, so a later crawl never resumes from an
+    outdated one.
+
+    Attributes:
+    -----------
+    path: The SQLite database file (":memory:" for a throwaway store).
+    max_age: The number of seconds a checkpointed page stays usable.
+    """
+
+    def __init__(self, path: str, max_age: float = DEFAULT_CHECKPOINT_MAX_AGE) -> None:
+        """
+        Args:
+            path (str): The SQLite database file, created if missing.
+            max_age (float): The number of seconds a checkpointed page stays usable.
+        """
+        self.path = path
+        self.max_age = max_age
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_PAGES_SCHEMA)
+        self._connection.execute(
+            "DELETE FROM checkpoint_pages WHERE saved_at < ?", (self._cutoff(),))
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.max_age
+
+    def completed_pages(self, subject_id: int) -> Set[int]:
+        """
+        Return the page numbers of a subject that are checkpointed and not expired.
+
+        Args:
+            subject_id (int): The ID of the subject.
+
+        Returns:
+            Set[int]: The completed page numbers.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT page_num FROM checkpoint_pages WHERE subject_id = ? AND saved_at >= ?",
+                (subject_id, self._cutoff())).fetchall()
+        return {page_num for (page_num,) in rows}
+
+    def save_page(self, books_page: BooksPage) -> None:
+        """
+        Checkpoint a fetched page, replacing any earlier copy of it.
+
+        Args:
+            books_page (BooksPage): The page to store.
+        """
+        books_json = json.dumps([book_record_to_dict(book) for book in books_page.books])
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoint_pages VALUES (?, ?, ?, ?, ?, ?)",
+                (books_page.subject_id, books_page.page_num, books_page.total_results,
+                 books_page.fetched_at.isoformat(), books_json, time.time()))
+            self._connection.commit()
+
+    def load_page(self, subject_id: int, page_num: int) -> Optional[BooksPage]:
+        """
+        Load a checkpointed page.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            page_num (int): The page number.
+
+        Returns:
+            Optional[BooksPage]: The stored page, or `None` if it was not
+            checkpointed, has expired or was dropped since.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT total_results, fetched_at, books FROM checkpoint_pages "
+                "WHERE subject_id = ? AND page_num = ? AND saved_at >= ?",
+                (subject_id, page_num, self._cutoff())).fetchone()
+        if row is None:
+            return None
+        total_results, fetched_at, books_json = row
+        books = [Book(**book) for book in json.loads(books_json)]
+        return BooksPage(
+            subject_id=subject_id,
+            page_num=page_num,
+            books=books,
+            total_results=total_results,
+            page_size=len(books),
+            fetched_at=datetime.fromisoformat(fetched_at))
+
+    def iter_pages(self, subject_id: int) -> Iterator[BooksPage]:
+        """
+        Yield the checkpointed pages of a subject in page order.
+
+        Args:
+            subject_id (int): The ID of the subject.
+
+        Yields:
+            BooksPage: The stored pages.
+        """
+        for page_num in sorted(self.completed_pages(subject_id)):
+            books_page = self.load_page(subject_id, page_num)
+            if books_page is not None:
+                yield books_page
+
+    def discard_stale(self, subject_id: int, total_results: int) -> None:
+        """
+        Drop the checkpointed pages of a subject that are expired or were saved
+        while the subject held a different number of books.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            total_results (int): The total number of books of a freshly fetched first page.
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM checkpoint_pages "
+                "WHERE subject_id = ? AND (total_results != ? OR saved_at < ?)",
+                (subject_id, total_results, self._cutoff()))
+            self._connection.commit()
+
+    def clear(self, subject_id: Optional[int] = None) -> None:
+        """
+        Drop the checkpointed pages of a subject, e.g. once its crawl completed.
+
+        Args:
+            subject_id (Optional[int]): The ID of the subject; `None` drops every subject.
+        """
+        with self._lock:
+            if subject_id is None:
+                self._connection.execute("DELETE FROM checkpoint_pages")
+            else:
+                self._connection.execute(
+                    "DELETE FROM checkpoint_pages WHERE subject_id = ?", (subject_id,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "CrawlCheckpoint":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class SeenBooksIndex:
+    """
+    A thread-safe SQLite index of the books already extracted per subject.
+
+    Every book is recorded with a hash of its parsed details, so a later crawl
+    of the subject can tell new and changed books apart from known ones.
+
+    Attributes:
+    -----------
+    path: The SQLite database file (":memory:" for a throwaway index).
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The SQLite database file, created if missing.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_SEEN_BOOKS_SCHEMA)
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def changed_books(self, subject_id: int, books: List[Any]) -> List[Any]:
+        """
+        Return the books that are new to a subject or changed since they were marked.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            books (List[Any]): The books of a page, see `BooksPage.books`.
+
+        Returns:
+            List[Any]: The new or changed books, in their original order.
+        """
+        if not books:
+            return []
+        book_ids = [str(book.book_id) for book in books]
+        placeholders = ", ".join("?" * len(book_ids))
+        with self._lock:
+            known = dict(self._connection.execute(
+                f"SELECT book_id, content_hash FROM seen_books "
+                f"WHERE subject_id = ? AND book_id IN ({placeholders})",
+                (subject_id, *book_ids)).fetchall())
+        return [book for book_id, book in zip(book_ids, books)
+                if known.get(book_id) != book_content_hash(book)]
+
+    def mark(self, subject_id: int, books: List[Any]) -> None:
+        """
+        Record books as extracted for a subject.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            books (List[Any]): The books to record, see `BooksPage.books`.
+        """
+        self.mark_hashes(
+            subject_id, [(str(book.book_id), book_content_hash(book)) for book in books])
+
+    def mark_hashes(self, subject_id: int, book_hashes: Iterable[Tuple[str, str]]) -> None:
+        """
+        Record books as extracted for a subject by their precomputed hashes.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            book_hashes (Iterable[Tuple[str, str]]): The `(book_id, content_hash)`
+                pairs to record, see `book_content_hash()`.
+        """
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO seen_books VALUES (?, ?, ?)",
+                [(subject_id, book_id, content_hash) for book_id, content_hash in book_hashes])
+            self._connection.commit()
+
+    def deferred(self) -> "DeferredSeenBooks":
+        """
+        Return a view of the index whose marks are only recorded once committed.
+
+        Returns:
+            DeferredSeenBooks: The view, usable wherever the index is.
+        """
+        return DeferredSeenBooks(self)
+
+    def count(self, subject_id: int) -> int:
+        """
+        Return the number of books recorded for a subject.
+
+        Args:
+            subject_id (int): The ID of the subject.
+
+        Returns:
+            int: The number of recorded books.
+        """
+        with self._lock:
+            (num_books,) = self._connection.execute(
+                "SELECT COUNT(*) FROM seen_books WHERE subject_id = ?",
+                (subject_id,)).fetchone()
+        return num_books
+
+    def clear(self, subject_id: Optional[int] = None) -> None:
+        """
+        Forget the recorded books of a subject, so its next crawl emits every book.
+
+        Args:
+            subject_id (Optional[int]): The ID of the subject; `None` forgets every subject.
+        """
+        with self._lock:
+            if subject_id is None:
+                self._connection.execute("DELETE FROM seen_books")
+            else:
+                self._connection.execute(
+                    "DELETE FROM seen_books WHERE subject_id = ?", (subject_id,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "SeenBooksIndex":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class DeferredSeenBooks:
+    """
+    A view of a `SeenBooksIndex` holding its marks back until committed.
+
+    Crawls mark a page's books as soon as the page is consumed, which is before
+    a buffered export has written them out. Crawling through this view instead
+    and committing it once the output is complete means a failed export marks
+    nothing, so the next refresh emits the same books again. Pending marks
+    already count as seen, so a book is still emitted once per crawl.
+
+    Attributes:
+    -----------
+    index: The index the marks are committed to.
+    """
+
+    def __init__(self, index: SeenBooksIndex) -> None:
+        """
+        Args:
+            index (SeenBooksIndex): The index the marks are committed to.
+        """
+        self.index = index
+        self._pending: Dict[int, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def changed_books(self, subject_id: int, books: List[Any]) -> List[Any]:
+        """
+        Return the books that are new to a subject or changed since they were
+        marked, counting the pending marks.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            books (List[Any]): The books of a page, see `BooksPage.books`.
+
+        Returns:
+            List[Any]: The new or changed books, in their original order.
+        """
+        books = self.index.changed_books(subject_id, books)
+        with self._lock:
+            pending = self._pending.get(subject_id)
+            if not pending:
+                return books
+            return [book for book in books
+                    if pending.get(str(book.book_id)) != book_content_hash(book)]
+
+    def mark(self, subject_id: int, books: List[Any]) -> None:
+        """
+        Hold books back to be recorded as extracted for a subject on `commit()`.
+
+        Args:
+            subject_id (int): The ID of the subject.
+            books (List[Any]): The books to record, see `BooksPage.books`.
+        """
+        with self._lock:
+            pending = self._pending.setdefault(subject_id, {})
+            for book in books:
+                pending[str(book.book_id)] = book_content_hash(book)
+
+    def commit(self) -> None:
+        """Record the pending marks in the index."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for subject_id, book_hashes in pending.items():
+            self.index.mark_hashes(subject_id, book_hashes.items())
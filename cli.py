@@ -0,0 +1,205 @@
+"""
+Ebooks Data Extractor Command-Line Runner
+=========================================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+=========================================
+
+A headless entry point for scripted extraction (e.g. cron jobs). It drives
+the same crawl and export functions as the Streamlit application, without
+importing Streamlit.
+
+Examples:
+---------
+    python cli.py --list
+    python cli.py --subject "Romance" -o romance.csv
+    python cli.py --topic "Computers/Programming" --id 1234 -o books.parquet
+    python cli.py --category "Non-Fiction" -o non_fiction.arrow --resume crawl.sqlite
+    python cli.py --id 1234 -o new.csv --new-only seen.sqlite --stop-after-known-pages 3
+    python cli.py --id 1234 -o backfill.parquet --processes 0 --workers 16 --rate 20
+
+Functions:
+----------
+1. build_parser(): Build the command-line argument parser.
+2. resolve_subject_ids(): Resolve the requested subjects, topics and categories to IDs.
+3. print_menu(): Print the categories and subjects of the menu with their IDs.
+4. main(): Run the command line.
+"""
+
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+import export_util as eu
+import scraper_util as su
+from checkpoint_util import CrawlCheckpoint, SeenBooksIndex
+from network_util import ResponseCache
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line argument parser.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Extract ebook data from eBooks.com into a CSV, Parquet or Arrow file.")
+    selection = parser.add_argument_group("selection (may be combined and repeated)")
+    selection.add_argument(
+        "--id", dest="ids", type=int, action="append", default=[], metavar="ID",
+        help="a subject or topic ID")
+    selection.add_argument(
+        "--subject", dest="subjects", action="append", default=[], metavar="NAME",
+        help="a subject name from the menu")
+    selection.add_argument(
+        "--topic", dest="topics", action="append", default=[], metavar="SUBJECT/TOPIC",
+        help="a topic name, qualified by its subject name")
+    selection.add_argument(
+        "--category", dest="categories", action="append", default=[], metavar="NAME",
+        help="every topic of a menu category")
+    parser.add_argument(
+        "--list", action="store_true",
+        help="print the categories and subjects of the menu with their IDs and exit")
+    parser.add_argument("-o", "--output", help="the file to write")
+    parser.add_argument(
+        "-f", "--format", choices=tuple(eu.EXPORT_FORMATS),
+        help="the export format (default: from the output extension, else csv)")
+    parser.add_argument(
+        "--workers", type=int, default=su.DEFAULT_MAX_WORKERS,
+        help="the maximum number of concurrent requests (default: %(default)s)")
+    parser.add_argument(
+        "--rate", type=float, default=su.DEFAULT_REQUESTS_PER_SECOND,
+        help="the request rate budget in requests per second (default: %(default)s)")
+    parser.add_argument(
+        "--processes", type=int, metavar="N",
+        help="decode and parse pages in N worker processes (0 for one per CPU), "
+             "for large backfills of a single subject")
+    parser.add_argument(
+        "--resume", metavar="PATH",
+        help="checkpoint completed pages to this file and resume from it")
+    parser.add_argument(
+        "--new-only", metavar="PATH",
+        help="only export books that are new or changed since the last run "
+             "recorded in this index file")
+    parser.add_argument(
+        "--stop-after-known-pages", type=int, metavar="N",
+        help="with --new-only, stop paging a subject after N consecutive pages "
+             "without a new or changed book (for newest-first listings)")
+    parser.add_argument(
+        "--cache", metavar="PATH",
+        help="cache API responses in this file and revalidate them on later runs")
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress")
+    return parser
+
+
+def resolve_subject_ids(args: argparse.Namespace, parser: argparse.ArgumentParser) -> List[int]:
+    """
+    Resolve the requested subjects, topics and categories to IDs.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+        parser (argparse.ArgumentParser): The parser, used to report unknown names.
+
+    Returns:
+        List[int]: The IDs to crawl, without duplicates, in the order requested.
+    """
+    subject_ids = list(args.ids)
+    if not (args.subjects or args.topics or args.categories):
+        return subject_ids
+
+    menu = su.load_subject_menu()
+    for subject_name in args.subjects:
+        if subject_name not in menu.subject_ids:
+            parser.error(f"unknown subject {subject_name!r}")
+        subject_ids.append(menu.subject_ids[subject_name])
+    for qualified_name in args.topics:
+        subject_name, _, topic_name = qualified_name.partition("/")
+        if subject_name not in menu.subject_ids:
+            parser.error(f"unknown subject {subject_name!r} in topic {qualified_name!r}")
+        topics = menu.topics_for(menu.subject_ids[subject_name])
+        if topic_name not in topics:
+            parser.error(f"unknown topic {topic_name!r} of subject {subject_name!r}")
+        subject_ids.append(topics[topic_name])
+    for category in args.categories:
+        if category not in menu.categories:
+            parser.error(f"unknown category {category!r}")
+        subject_ids.extend(menu.category_topic_ids(category, max_workers=args.workers))
+    return list(dict.fromkeys(subject_ids))
+
+
+def print_menu() -> None:
+    """Print the categories and subjects of the menu with their IDs."""
+    menu = su.load_subject_menu()
+    for category, subjects in menu.categories.items():
+        print(category)
+        for subject_name, subject_id in subjects.items():
+            print(f"  {subject_id:>8}  {subject_name}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line.
+
+    Args:
+        argv (Optional[List[str]]): The arguments; defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: The exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.cache:
+        su.get_client().response_cache = ResponseCache(args.cache)
+    if args.list:
+        print_menu()
+        return 0
+    if not args.output:
+        parser.error("the following arguments are required: -o/--output")
+
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.output)[1].lstrip(".").lower()
+        fmt = next((name for name, export_format in eu.EXPORT_FORMATS.items()
+                    if export_format["extension"] == extension), "csv")
+
+    subject_ids = resolve_subject_ids(args, parser)
+    if not subject_ids:
+        parser.error("select at least one --id, --subject, --topic or --category")
+    if args.processes is not None and (
+            len(subject_ids) != 1 or args.resume or args.new_only):
+        parser.error("--processes requires a single subject, without --resume or --new-only")
+    if args.stop_after_known_pages is not None and (
+            not args.new_only or args.stop_after_known_pages < 1):
+        parser.error("--stop-after-known-pages requires --new-only and a positive N")
+
+    def report_progress(books_page: su.BooksPage) -> None:
+        print(f"subject {books_page.subject_id}: page {books_page.page_num}, "
+              f"{books_page.page_size} books", file=sys.stderr)
+
+    checkpoint = CrawlCheckpoint(args.resume) if args.resume else None
+    seen_index = SeenBooksIndex(args.new_only) if args.new_only else None
+    try:
+        rows_written = eu.export_crawl(
+            subject_ids, args.output, fmt,
+            max_workers=args.workers, requests_per_second=args.rate,
+            on_page=None if args.quiet else report_progress,
+            checkpoint=checkpoint, seen_index=seen_index, processes=args.processes,
+            stop_after_known_pages=args.stop_after_known_pages)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if seen_index is not None:
+            seen_index.close()
+
+    if not args.quiet:
+        print(f"Wrote {rows_written} books to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
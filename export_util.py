@@ -0,0 +1,511 @@
+"""
+Data Export Utility Functions
+=============================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+=============================
+
+This module provides sinks that write crawled book records to disk
+incrementally, so a crawl never has to hold its full result set in memory.
+
+Classes:
+--------
+1. RecordSink: Base class buffering records and flushing them in batches.
+2. CsvSink: Append records to a CSV file.
+3. ParquetSink: Append records to a Parquet file, one row group per batch.
+4. ArrowIpcSink: Append records to an Arrow IPC file, one record batch per batch.
+
+Functions:
+----------
+1. book_arrow_schema(): Build the typed Arrow schema of a book record.
+2. columns_to_table(): Build an Arrow table from parsed book columns.
+3. open_sink(): Open the sink of an export format.
+4. write_records(): Stream records into a file and return the row count.
+5. export_crawl(): Crawl one or more subjects straight into an export file.
+"""
+
+
+import csv
+import typing
+from dataclasses import fields
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from network_util import RateLimiter
+from scraper_util import (DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, ENCODED_FIELDS,
+                          Book, BooksPage, iter_book_batches, iter_book_batches_parallel,
+                          iter_subjects_book_batches)
+
+if TYPE_CHECKING:
+    from checkpoint_util import CrawlCheckpoint, SeenBooksIndex
+
+DEFAULT_BUFFER_SIZE = 500
+CSV_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+EXPORT_FORMATS = {
+    "csv": {"extension": "csv", "mime": "text/csv"},
+    "parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "arrow": {"extension": "arrow", "mime": "application/vnd.apache.arrow.file"},
+}
+
+_ARROW_TYPES = {str: pa.string(), int: pa.int64(), float: pa.float64()}
+
+
+def book_arrow_schema(dictionary_encoded: bool = False) -> pa.Schema:
+    """
+    Build the typed Arrow schema of a book record from the `Book` dataclass.
+
+    Args:
+        dictionary_encoded (bool): Whether the `ENCODED_FIELDS` columns use
+            Arrow dictionary types instead of plain strings.
+
+    Returns:
+        pa.Schema: One nullable field per `Book` attribute, followed by the
+        `scrape_timestamp` column added by the crawl.
+    """
+    type_hints = typing.get_type_hints(Book)
+    schema_fields = []
+    for book_field in fields(Book):
+        field_type = type_hints[book_field.name]
+        # Unwrap Optional[X] into X
+        inner_types = [arg for arg in typing.get_args(field_type) if arg is not type(None)]
+        python_type = inner_types[0] if inner_types else field_type
+        schema_fields.append(pa.field(book_field.name, _ARROW_TYPES[python_type]))
+    schema_fields.append(pa.field("scrape_timestamp", pa.timestamp("us")))
+    if dictionary_encoded:
+        schema_fields = [
+            pa.field(schema_field.name, pa.dictionary(pa.int32(), schema_field.type))
+            if schema_field.name in ENCODED_FIELDS else schema_field
+            for schema_field in schema_fields]
+    return pa.schema(schema_fields)
+
+
+def columns_to_table(columns: Dict[str, List[Any]],
+                     schema: Optional[pa.Schema] = None) -> pa.Table:
+    """
+    Build an Arrow table from parsed book columns.
+
+    Args:
+        columns (Dict[str, List[Any]]): The columns, e.g. from `parse_books_batch()`.
+        schema (Optional[pa.Schema]): The table schema; defaults to `book_arrow_schema()`.
+            Schema fields missing from `columns` are filled with nulls.
+
+    Returns:
+        pa.Table: The typed table.
+    """
+    schema = schema if schema is not None else book_arrow_schema()
+    num_rows = len(next(iter(columns.values()), []))
+    arrays = [pa.array(columns[schema_field.name], type=schema_field.type)
+              if schema_field.name in columns
+              else pa.nulls(num_rows, type=schema_field.type)
+              for schema_field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class RecordSink:
+    """
+    A base class for sinks appending book records to a file as they arrive.
+
+    Records, or batches of them given as columns, are held in a buffer of at
+    most `buffer_size` rows, which is flushed to disk whenever it fills up and
+    when the sink is closed. Subclasses implement `_write_rows()` and
+    `_close_file()`, and may override `_write_columns()`.
+
+    Attributes:
+    -----------
+    path: The path of the output file.
+    rows_written: The number of records written so far.
+    """
+
+    def __init__(self, path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        Args:
+            path (str): The path of the file to create.
+            buffer_size (int): The maximum number of rows buffered in memory.
+        """
+        self.path = path
+        self.rows_written = 0
+        self._buffer_size = buffer_size
+        self._buffer: List[Dict[str, Any]] = []
+        self._column_buffer: Dict[str, List[Any]] = {}
+        self._column_buffer_rows = 0
+        self._closed = False
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Append one record to the file.
+
+        Args:
+            record (Dict[str, Any]): The book record.
+        """
+        if self._column_buffer:
+            self._flush_columns()
+        self._buffer.append(record)
+        if len(self._buffer) >= self._buffer_size:
+            self._flush_rows()
+
+    def write_batch(self, columns: Dict[str, List[Any]]) -> None:
+        """
+        Append a batch of records given as columns, e.g. from `parse_books_batch()`.
+
+        Batches are gathered until `buffer_size` rows are buffered, so a file
+        is written in chunks of `buffer_size` rows however small the batches.
+
+        Args:
+            columns (Dict[str, List[Any]]): Equal-length value lists keyed by column name.
+        """
+        num_rows = len(next(iter(columns.values()), []))
+        if not num_rows:
+            return
+        if self._buffer:
+            self._flush_rows()
+        if self._column_buffer and list(columns) != list(self._column_buffer):
+            self._flush_columns()
+        if not self._column_buffer:
+            self._column_buffer = {name: [] for name in columns}
+        for name, values in columns.items():
+            self._column_buffer[name].extend(values)
+        self._column_buffer_rows += num_rows
+        while self._column_buffer_rows >= self._buffer_size:
+            self._flush_columns(self._buffer_size)
+
+    def flush(self) -> None:
+        """Write the buffered rows to disk."""
+        self._flush_rows()
+        self._flush_columns()
+
+    def _flush_rows(self) -> None:
+        if not self._buffer:
+            return
+        self._write_rows(self._buffer)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def _flush_columns(self, num_rows: Optional[int] = None) -> None:
+        if not self._column_buffer_rows:
+            return
+        if num_rows is None or num_rows >= self._column_buffer_rows:
+            chunk, self._column_buffer = self._column_buffer, {}
+            num_rows = self._column_buffer_rows
+        else:
+            chunk = {name: values[:num_rows] for name, values in self._column_buffer.items()}
+            for values in self._column_buffer.values():
+                del values[:num_rows]
+        self._column_buffer_rows -= num_rows
+        self._write_columns(chunk)
+        self.rows_written += num_rows
+
+    def close(self) -> None:
+        """Flush the remaining rows and close the file."""
+        if not self._closed:
+            self.flush()
+            self._close_file()
+            self._closed = True
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _write_columns(self, columns: Dict[str, List[Any]]) -> None:
+        names = list(columns)
+        self._write_rows([dict(zip(names, values)) for values in zip(*columns.values())])
+
+    def _close_file(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> "RecordSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class CsvSink(RecordSink):
+    """
+    A sink appending book records to a CSV file.
+
+    `datetime` values of the `scrape_timestamp` column are formatted with
+    `CSV_TIMESTAMP_FORMAT` as they are written; since a whole page shares one
+    timestamp, each distinct value is only formatted once.
+    """
+
+    def __init__(self, path: str, fieldnames: Optional[Sequence[str]] = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        Args:
+            path (str): The path of the CSV file to create.
+            fieldnames (Optional[Sequence[str]]): The column order; defaults to
+                the keys of the first record.
+            buffer_size (int): The maximum number of rows buffered in memory.
+        """
+        super().__init__(path, buffer_size)
+        self._fieldnames = list(fieldnames) if fieldnames is not None else None
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer: Optional[csv.DictWriter] = None
+        self._formatted: Dict[datetime, str] = {}
+
+    def _format_timestamp(self, value: Any) -> Any:
+        if not isinstance(value, datetime):
+            return value
+        formatted = self._formatted.get(value)
+        if formatted is None:
+            if len(self._formatted) >= self._buffer_size:
+                self._formatted.clear()
+            formatted = self._formatted[value] = value.strftime(CSV_TIMESTAMP_FORMAT)
+        return formatted
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if self._writer is None:
+            fieldnames = self._fieldnames or list(rows[0].keys())
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+            self._writer.writeheader()
+        for row in rows:
+            if "scrape_timestamp" in row:
+                row = dict(row, scrape_timestamp=self._format_timestamp(row["scrape_timestamp"]))
+            self._writer.writerow(row)
+        self._file.flush()
+
+    def _write_columns(self, columns: Dict[str, List[Any]]) -> None:
+        if self._writer is None:
+            fieldnames = self._fieldnames or list(columns)
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+            self._writer.writeheader()
+        if list(columns) != self._writer.fieldnames:
+            super()._write_columns(columns)
+            return
+        if "scrape_timestamp" in columns:
+            columns = dict(columns, scrape_timestamp=[
+                self._format_timestamp(value) for value in columns["scrape_timestamp"]])
+        # Columns already in header order: write plain rows, skipping the dicts
+        self._writer.writer.writerows(zip(*columns.values()))
+        self._file.flush()
+
+    def _close_file(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(RecordSink):
+    """
+    A sink appending book records to a Parquet file.
+
+    Every flushed buffer becomes one row group, so `buffer_size` is also the
+    row-group size of the file.
+    """
+
+    def __init__(self, path: str, schema: Optional[pa.Schema] = None,
+                 compression: str = "zstd",
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        Args:
+            path (str): The path of the Parquet file to create.
+            schema (Optional[pa.Schema]): The file schema; defaults to `book_arrow_schema()`.
+            compression (str): The Parquet compression codec.
+            buffer_size (int): The maximum number of rows buffered in memory.
+        """
+        super().__init__(path, buffer_size)
+        self.schema = schema if schema is not None else book_arrow_schema()
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def _write_columns(self, columns: Dict[str, List[Any]]) -> None:
+        self._writer.write_table(columns_to_table(columns, self.schema))
+
+    def _close_file(self) -> None:
+        self._writer.close()
+
+
+class ArrowIpcSink(RecordSink):
+    """
+    A sink appending book records to an Arrow IPC (Feather v2) file.
+
+    Every flushed buffer becomes one record batch of the file. The IPC file
+    format allows a single dictionary per field, so dictionary-typed columns
+    are encoded against one growing dictionary per field and each batch only
+    emits the new values as a delta.
+    """
+
+    def __init__(self, path: str, schema: Optional[pa.Schema] = None,
+                 compression: Optional[str] = "zstd",
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        Args:
+            path (str): The path of the Arrow file to create.
+            schema (Optional[pa.Schema]): The file schema; defaults to `book_arrow_schema()`.
+            compression (Optional[str]): The buffer compression codec ("lz4", "zstd" or None).
+            buffer_size (int): The maximum number of rows buffered in memory.
+        """
+        super().__init__(path, buffer_size)
+        self.schema = schema if schema is not None else book_arrow_schema()
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = pa.ipc.new_file(
+            self._sink, self.schema,
+            options=pa.ipc.IpcWriteOptions(
+                compression=compression, emit_dictionary_deltas=True))
+        self._dictionaries: Dict[str, Dict[Any, int]] = {
+            schema_field.name: {} for schema_field in self.schema
+            if pa.types.is_dictionary(schema_field.type)}
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        self._write_columns({name: [row.get(name) for row in rows] for name in self.schema.names})
+
+    def _write_columns(self, columns: Dict[str, List[Any]]) -> None:
+        num_rows = len(next(iter(columns.values()), []))
+        arrays = []
+        for schema_field in self.schema:
+            values = columns.get(schema_field.name)
+            if values is None:
+                arrays.append(pa.nulls(num_rows, type=schema_field.type))
+            elif schema_field.name in self._dictionaries:
+                arrays.append(self._encode(schema_field, values))
+            else:
+                arrays.append(pa.array(values, type=schema_field.type))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def _encode(self, schema_field: pa.Field, values: List[Any]) -> pa.DictionaryArray:
+        index = self._dictionaries[schema_field.name]
+        codes: List[Optional[int]] = []
+        for value in values:
+            if value is None:
+                codes.append(None)
+                continue
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(index)
+            codes.append(code)
+        # Dicts keep insertion order, so the keys are the dictionary in code order
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, type=schema_field.type.index_type),
+            pa.array(list(index), type=schema_field.type.value_type))
+
+    def _close_file(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
+_SINKS = {"csv": CsvSink, "parquet": ParquetSink, "arrow": ArrowIpcSink}
+
+
+def open_sink(path: str, fmt: str = "csv", buffer_size: int = DEFAULT_BUFFER_SIZE,
+              dictionary_encoded: bool = False) -> RecordSink:
+    """
+    Open the sink of an export format.
+
+    Args:
+        path (str): The path of the file to create.
+        fmt (str): One of the keys of `EXPORT_FORMATS`.
+        buffer_size (int): The maximum number of rows buffered in memory.
+        dictionary_encoded (bool): Whether the Parquet/Arrow sinks store the
+            `ENCODED_FIELDS` columns as dictionary arrays (ignored for CSV).
+
+    Returns:
+        RecordSink: The opened sink.
+    """
+    if fmt not in _SINKS:
+        raise ValueError(
+            f"Unknown export format {fmt!r}; expected one of {tuple(EXPORT_FORMATS)}")
+    if fmt == "csv":
+        return CsvSink(path, buffer_size=buffer_size)
+    return _SINKS[fmt](path, schema=book_arrow_schema(dictionary_encoded),
+                       buffer_size=buffer_size)
+
+
+def write_records(records: Iterable[Dict[str, Any]], path: str, fmt: str = "csv",
+                  buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Stream records into a file.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): The book records, e.g. `iter_books()`.
+        path (str): The path of the file to create.
+        fmt (str): One of the keys of `EXPORT_FORMATS`.
+        buffer_size (int): The maximum number of rows buffered in memory.
+
+    Returns:
+        int: The number of records written.
+    """
+    with open_sink(path, fmt, buffer_size=buffer_size) as sink:
+        for record in records:
+            sink.write(record)
+    return sink.rows_written
+
+
+def export_crawl(
+    subject_ids: Sequence[int],
+    path: str,
+    fmt: str = "csv",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    on_page: Optional[Callable[[BooksPage], None]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+    seen_index: Optional["SeenBooksIndex"] = None,
+    processes: Optional[int] = None,
+    stop_after_known_pages: Optional[int] = None,
+) -> int:
+    """
+    Crawl one or more subjects straight into an export file.
+
+    A single subject is crawled in page order with `iter_book_batches()`;
+    several are scheduled together with `iter_subjects_book_batches()`, which
+    also drops books listed under more than one of them. The checkpointed
+    pages of the subjects are dropped, and the exported books marked in the
+    seen-books index, only once the file is complete.
+
+    Args:
+        subject_ids (Sequence[int]): The IDs of the subjects or topics to crawl.
+        path (str): The path of the file to create.
+        fmt (str): One of the keys of `EXPORT_FORMATS`.
+        max_workers (int): The maximum number of concurrent requests.
+        requests_per_second (float): The request rate budget for the crawl.
+        on_page (Optional[Callable[[BooksPage], None]]): Called with every
+            fetched page, e.g. to report progress.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages
+            to resume from and save to.
+        seen_index (Optional[SeenBooksIndex]): The index of the books already
+            extracted; if given, only new or changed books are exported.
+        processes (Optional[int]): If given, decode and parse the pages in this
+            many worker processes (0 for one per CPU) with
+            `iter_book_batches_parallel()`; only for a single subject crawled
+            without a checkpoint or seen-books index.
+        stop_after_known_pages (Optional[int]): With `seen_index`, stop paging a
+            subject after this many consecutive pages without a new or changed
+            book; see `crawl_new_pages()`.
+
+    Returns:
+        int: The number of records written.
+    """
+    subject_ids = list(dict.fromkeys(subject_ids))
+    seen_marks = seen_index.deferred() if seen_index is not None else None
+    if processes is not None:
+        if len(subject_ids) != 1 or checkpoint is not None or seen_index is not None:
+            raise ValueError(
+                "Process-pool parsing supports a single subject without a checkpoint "
+                "or seen-books index")
+        books_batches = iter_book_batches_parallel(
+            subject_ids[0], max_workers=max_workers, requests_per_second=requests_per_second,
+            processes=processes or None, on_page=on_page, rate_limiter=rate_limiter)
+    elif len(subject_ids) == 1:
+        books_batches = iter_book_batches(
+            subject_ids[0], max_workers=max_workers, requests_per_second=requests_per_second,
+            on_page=on_page, rate_limiter=rate_limiter, checkpoint=checkpoint,
+            seen_index=seen_marks, stop_after_known_pages=stop_after_known_pages)
+    else:
+        books_batches = iter_subjects_book_batches(
+            subject_ids, max_workers=max_workers, requests_per_second=requests_per_second,
+            on_page=on_page, rate_limiter=rate_limiter, checkpoint=checkpoint,
+            seen_index=seen_marks, stop_after_known_pages=stop_after_known_pages)
+    with open_sink(path, fmt, dictionary_encoded=True) as sink:
+        for books_columns in books_batches:
+            sink.write_batch(books_columns)
+    if seen_marks is not None:
+        seen_marks.commit()
+    if checkpoint is not None:
+        for subject_id in subject_ids:
+            checkpoint.clear(subject_id)
+    return sink.rows_written
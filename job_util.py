@@ -0,0 +1,419 @@
+"""
+Crawl Job Utility Functions
+===========================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+===========================
+
+This module runs crawls as background jobs, decoupled from the script run
+that submitted them: a job keeps running across Streamlit reruns and browser
+disconnects, its status and output file are persisted on disk, and the
+interface only polls it.
+
+Classes:
+--------
+1. CrawlJob: The persisted state of one background crawl.
+2. JobCancelled: Raised inside a job's crawl to stop it once it was cancelled.
+3. JobManager: Worker pool running queued crawl jobs fairly across their owners.
+"""
+
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Deque, Dict, List, Optional, Sequence, Set
+
+import export_util as eu
+import scraper_util as su
+from checkpoint_util import CrawlCheckpoint, SeenBooksIndex
+from network_util import RateLimiter
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = frozenset({"succeeded", "failed", "cancelled"})
+
+_JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+)
+"""
+
+
+@dataclass
+class CrawlJob:
+    """
+    A class to represent the persisted state of one background crawl.
+
+    Attributes:
+    -----------
+    job_id: The ID of the job.
+    owner: The identity jobs are shared fairly between, e.g. a user session.
+    subject_ids: The IDs of the subjects or topics to crawl.
+    fmt: The export format, one of the keys of `EXPORT_FORMATS`.
+    output_path: The export file written by the job.
+    new_books_only: Whether only the books new or changed since the previous
+        such job of the subjects are exported.
+    stop_after_known_pages: With `new_books_only`, stop paging a subject after
+        this many consecutive pages without a new or changed book.
+    status: One of `JOB_STATUSES`.
+    books_seen: The number of books fetched so far.
+    total_books: The total number of books of the subjects seen so far.
+    rows_written: The number of records exported, once the job succeeded.
+    error: The error that made the job fail, if any.
+    created_at: The time the job was submitted (seconds since the epoch).
+    finished_at: The time the job finished, if it did.
+    """
+    job_id: str
+    owner: str
+    subject_ids: List[int]
+    fmt: str
+    output_path: str
+    new_books_only: bool = False
+    stop_after_known_pages: Optional[int] = None
+    status: str = "queued"
+    books_seen: int = 0
+    total_books: int = 0
+    rows_written: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job succeeded, failed or was cancelled."""
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def progress(self) -> float:
+        """The fraction of the books fetched so far, between 0 and 1."""
+        if self.status == "succeeded":
+            return 1.0
+        if self.total_books == 0:
+            return 0.0
+        return min(self.books_seen / self.total_books, 1.0)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's crawl to stop it once the job was cancelled."""
+
+
+class JobManager:
+    """
+    A pool of worker threads running queued crawl jobs in the background.
+
+    Jobs are queued per owner and workers take them round-robin across owners,
+    so one user submitting many jobs cannot starve the others. Every job
+    crawls through one shared `RateLimiter`, keeping the combined request rate
+    within a single budget, but checkpoints its pages to a `CrawlCheckpoint` of
+    its own, so concurrent jobs of the same subject never see or drop each
+    other's pages. Only jobs exporting new books only read and update the
+    shared `SeenBooksIndex`.
+
+    Job states are persisted to SQLite under `state_dir` and output files are
+    written there as well. Jobs that were queued or running when the process
+    stopped are queued again on start-up, and failed jobs can be retried; both
+    resume from their checkpointed pages. The checkpoint of a job is deleted
+    once it succeeds, is cancelled or is removed.
+
+    Attributes:
+    -----------
+    state_dir: The directory holding the job database, checkpoints, seen books and outputs.
+    rate_limiter: The limiter shared by the crawls of every job.
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        num_workers: int = 2,
+        max_workers_per_job: int = su.DEFAULT_MAX_WORKERS,
+        requests_per_second: float = su.DEFAULT_REQUESTS_PER_SECOND,
+    ) -> None:
+        """
+        Args:
+            state_dir (str): The directory holding the job database, checkpoints,
+                seen books and outputs; created if missing.
+            num_workers (int): The number of jobs run at once.
+            max_workers_per_job (int): The maximum number of concurrent requests of a job.
+            requests_per_second (float): The request rate budget shared by all jobs.
+        """
+        os.makedirs(os.path.join(state_dir, "outputs"), exist_ok=True)
+        os.makedirs(os.path.join(state_dir, "checkpoints"), exist_ok=True)
+        os.makedirs(os.path.join(state_dir, "seen_books"), exist_ok=True)
+        self.state_dir = state_dir
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self._max_workers_per_job = max_workers_per_job
+        self._connection = sqlite3.connect(
+            os.path.join(state_dir, "jobs.sqlite"), check_same_thread=False)
+        self._connection.execute(_JOBS_SCHEMA)
+        self._connection.commit()
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._jobs: Dict[str, CrawlJob] = {}
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._cancelled: Set[str] = set()
+        self._seen_indexes: Dict[str, SeenBooksIndex] = {}
+        self._stopping = False
+
+        job_fields = {job_field.name for job_field in fields(CrawlJob)}
+        for (state,) in self._connection.execute("SELECT state FROM jobs"):
+            job = CrawlJob(**{name: value for name, value in json.loads(state).items()
+                              if name in job_fields})
+            self._jobs[job.job_id] = job
+        with self._lock:
+            for job in sorted(self._jobs.values(), key=lambda job: job.created_at):
+                if not job.finished:
+                    job.status = "queued"
+                    self._enqueue(job)
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"crawl-job-{worker_num}", daemon=True)
+            for worker_num in range(num_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, owner: str, subject_ids: Sequence[int], fmt: str = "csv",
+               new_books_only: bool = False,
+               stop_after_known_pages: Optional[int] = None) -> CrawlJob:
+        """
+        Queue a crawl job.
+
+        Args:
+            owner (str): The identity jobs are shared fairly between.
+            subject_ids (Sequence[int]): The IDs of the subjects or topics to crawl.
+            fmt (str): One of the keys of `EXPORT_FORMATS`.
+            new_books_only (bool): Whether to only export new or changed books.
+            stop_after_known_pages (Optional[int]): With `new_books_only`, stop
+                paging a subject after this many consecutive pages without a
+                new or changed book; `None` crawls every page.
+
+        Returns:
+            CrawlJob: A snapshot of the queued job.
+        """
+        if fmt not in eu.EXPORT_FORMATS:
+            raise ValueError(
+                f"Unknown export format {fmt!r}; expected one of {tuple(eu.EXPORT_FORMATS)}")
+        job_id = uuid.uuid4().hex
+        extension = eu.EXPORT_FORMATS[fmt]["extension"]
+        job = CrawlJob(
+            job_id=job_id,
+            owner=owner,
+            subject_ids=list(dict.fromkeys(subject_ids)),
+            fmt=fmt,
+            output_path=os.path.join(self.state_dir, "outputs", f"{job_id}.{extension}"),
+            new_books_only=new_books_only,
+            stop_after_known_pages=stop_after_known_pages)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+            self._enqueue(job)
+            return replace(job)
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        """
+        Return a snapshot of a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            Optional[CrawlJob]: The job, or `None` if it is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return replace(job) if job is not None else None
+
+    def jobs_for(self, owner: str) -> List[CrawlJob]:
+        """
+        Return snapshots of the jobs of an owner, oldest first.
+
+        Args:
+            owner (str): The identity the jobs were submitted with.
+
+        Returns:
+            List[CrawlJob]: The jobs.
+        """
+        with self._lock:
+            jobs = [replace(job) for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> None:
+        """
+        Cancel a job: a queued job never starts, a running one stops after its current page.
+
+        Args:
+            job_id (str): The ID of the job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            if job.status == "queued":
+                queue = self._queues.get(job.owner)
+                if queue is not None and job_id in queue:
+                    queue.remove(job_id)
+                    if not queue:
+                        del self._queues[job.owner]
+                self._finish(job, "cancelled")
+                self._discard_checkpoint(job_id)
+            else:
+                self._cancelled.add(job_id)
+
+    def retry(self, job_id: str) -> Optional[CrawlJob]:
+        """
+        Queue a failed job again; it resumes from the pages it checkpointed.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            Optional[CrawlJob]: A snapshot of the queued job, or `None` if the
+            job is unknown or did not fail.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "failed":
+                return None
+            job.status = "queued"
+            job.error = None
+            job.finished_at = None
+            self._save(job)
+            self._enqueue(job)
+            return replace(job)
+
+    def remove(self, job_id: str) -> None:
+        """
+        Forget a finished job and delete its output file.
+
+        Args:
+            job_id (str): The ID of the job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.finished:
+                return
+            del self._jobs[job_id]
+            self._connection.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            self._connection.commit()
+        if os.path.exists(job.output_path):
+            os.remove(job.output_path)
+        self._discard_checkpoint(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the workers once their current jobs are done; queued jobs stay
+        persisted and are resumed by the next manager.
+
+        Args:
+            wait (bool): Whether to wait for the running jobs to finish.
+        """
+        with self._ready:
+            self._stopping = True
+            self._ready.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _enqueue(self, job: CrawlJob) -> None:
+        self._queues.setdefault(job.owner, deque()).append(job.job_id)
+        self._ready.notify()
+
+    def _next_job(self) -> Optional[CrawlJob]:
+        with self._ready:
+            while not self._queues and not self._stopping:
+                self._ready.wait()
+            if self._stopping:
+                return None
+            # Take the next job of the owner waiting longest, then send it to the back
+            owner, queue = next(iter(self._queues.items()))
+            job = self._jobs[queue.popleft()]
+            del self._queues[owner]
+            if queue:
+                self._queues[owner] = queue
+            job.status = "running"
+            job.books_seen = job.total_books = 0
+            self._save(job)
+            return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: CrawlJob) -> None:
+        subject_totals: Dict[int, int] = {}
+
+        def report_progress(books_page: su.BooksPage) -> None:
+            with self._lock:
+                if job.job_id in self._cancelled:
+                    raise JobCancelled(job.job_id)
+                subject_totals[books_page.subject_id] = books_page.total_results
+                job.books_seen += books_page.page_size
+                job.total_books = sum(subject_totals.values())
+                self._save(job)
+
+        checkpoint = CrawlCheckpoint(self._checkpoint_path(job.job_id))
+        try:
+            rows_written = eu.export_crawl(
+                job.subject_ids, job.output_path, job.fmt,
+                max_workers=self._max_workers_per_job, on_page=report_progress,
+                rate_limiter=self.rate_limiter, checkpoint=checkpoint,
+                seen_index=self._seen_index(job.owner) if job.new_books_only else None,
+                stop_after_known_pages=job.stop_after_known_pages)
+        except JobCancelled:
+            checkpoint.close()
+            self._discard_checkpoint(job.job_id)
+            if os.path.exists(job.output_path):
+                os.remove(job.output_path)
+            with self._lock:
+                self._finish(job, "cancelled")
+        except Exception:
+            # Keep the checkpoint, so a retry resumes where the job stopped
+            checkpoint.close()
+            with self._lock:
+                job.error = traceback.format_exc(limit=3)
+                self._finish(job, "failed")
+        else:
+            checkpoint.close()
+            self._discard_checkpoint(job.job_id)
+            with self._lock:
+                job.rows_written = rows_written
+                self._finish(job, "succeeded")
+
+    def _seen_index(self, owner: str) -> SeenBooksIndex:
+        # Every owner has their own index, so one's runs never hide books from another
+        with self._lock:
+            seen_index = self._seen_indexes.get(owner)
+            if seen_index is None:
+                file_name = hashlib.sha256(owner.encode()).hexdigest()[:32] + ".sqlite"
+                seen_index = SeenBooksIndex(os.path.join(self.state_dir, "seen_books", file_name))
+                self._seen_indexes[owner] = seen_index
+            return seen_index
+
+    def _checkpoint_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, "checkpoints", f"{job_id}.sqlite")
+
+    def _discard_checkpoint(self, job_id: str) -> None:
+        checkpoint_path = self._checkpoint_path(job_id)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    def _finish(self, job: CrawlJob, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self._cancelled.discard(job.job_id)
+        self._save(job)
+
+    def _save(self, job: CrawlJob) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?)", (job.job_id, json.dumps(asdict(job))))
+        self._connection.commit()
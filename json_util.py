@@ -0,0 +1,174 @@
+"""
+JSON Decoding Utility Functions
+===============================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+===============================
+
+This module provides the JSON decoder of the API responses. The fastest
+installed backend is used (msgspec, then orjson, then the standard library).
+With msgspec, bodies can also be decoded straight into typed records, which
+skips the fields the records do not declare rather than materializing them
+as Python objects.
+
+Classes:
+--------
+1. JsonDecoder: Decoder of API response bodies built on one JSON backend.
+2. SchemaMismatchError: Raised when a well-formed body does not match its typed schema.
+
+Functions:
+----------
+1. available_backends(): Return the installed JSON backends, fastest first.
+2. get_json_decoder(): Return the module-level decoder used by the fetchers.
+3. set_json_decoder(): Replace the module-level decoder (e.g. to force a backend).
+"""
+
+
+import json
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+else:
+    # Typed records rely on `__post_init__` hooks, added in msgspec 0.18
+    if tuple(int(part) for part in msgspec.__version__.split(".")[:2]) < (0, 18):
+        msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_BACKENDS = ("msgspec", "orjson", "json")
+
+
+def available_backends() -> Tuple[str, ...]:
+    """
+    Return the installed JSON backends, fastest first.
+
+    Returns:
+        Tuple[str, ...]: The names of the backends, a subset of `JSON_BACKENDS`.
+    """
+    installed = {"msgspec": msgspec is not None, "orjson": orjson is not None, "json": True}
+    return tuple(backend for backend in JSON_BACKENDS if installed[backend])
+
+
+class SchemaMismatchError(Exception):
+    """
+    Raised when a well-formed JSON body does not match the type it is decoded into.
+
+    Deliberately not a `ValueError`: the mismatch is a property of the data,
+    so retrying the request like a malformed body cannot help.
+    """
+
+
+def _msgspec_loads(decoder: Any) -> Callable[[Union[bytes, str]], Any]:
+    def loads(content: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(content)
+        except msgspec.ValidationError as error:
+            raise SchemaMismatchError(str(error)) from error
+        except msgspec.DecodeError as error:
+            # Surface malformed bodies like the other backends, so they are retried
+            raise ValueError(str(error)) from error
+
+    return loads
+
+
+class JsonDecoder:
+    """
+    A decoder of API response bodies built on one JSON backend.
+
+    Every backend raises `ValueError` for a malformed body, so the retry
+    policies treat decoding failures alike whichever backend is used.
+
+    Attributes:
+    -----------
+    backend: The name of the backend, one of `JSON_BACKENDS`.
+    """
+
+    def __init__(self, backend: Optional[str] = None) -> None:
+        """
+        Args:
+            backend (Optional[str]): The backend to use; defaults to the fastest
+                installed one.
+
+        Raises:
+            ValueError: If the backend is unknown or not installed.
+        """
+        backends = available_backends()
+        if backend is None:
+            backend = backends[0]
+        elif backend not in backends:
+            raise ValueError(
+                f"JSON backend {backend!r} is not available; expected one of {backends}")
+        self.backend = backend
+
+        self._typed_loads: Dict[Any, Callable[[Union[bytes, str]], Any]] = {}
+        if backend == "msgspec":
+            self._loads = _msgspec_loads(msgspec.json.Decoder())
+        else:
+            self._loads = orjson.loads if backend == "orjson" else json.loads
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        """
+        Decode a JSON body.
+
+        Args:
+            content (Union[bytes, str]): The body.
+
+        Returns:
+            Any: The decoded payload.
+        """
+        return self._loads(content)
+
+    def typed_loads(self, type_: Any) -> Optional[Callable[[Union[bytes, str]], Any]]:
+        """
+        Return a function decoding JSON bodies straight into instances of a type,
+        validating the whole body in the same pass.
+
+        Args:
+            type_ (Any): The type to decode into, e.g. a `msgspec.Struct`.
+
+        Returns:
+            Optional[Callable[[Union[bytes, str]], Any]]: The decoding function,
+            or `None` if the backend is not msgspec. It raises `ValueError` for
+            a malformed body and `SchemaMismatchError` for a well-formed body
+            that does not match the type.
+        """
+        if self.backend != "msgspec":
+            return None
+        loads = self._typed_loads.get(type_)
+        if loads is None:
+            loads = self._typed_loads[type_] = _msgspec_loads(msgspec.json.Decoder(type_))
+        return loads
+
+
+_json_decoder = JsonDecoder()
+
+
+def get_json_decoder() -> JsonDecoder:
+    """
+    Return the module-level decoder used by the fetchers.
+
+    Returns:
+        JsonDecoder: The shared decoder.
+    """
+    return _json_decoder
+
+
+def set_json_decoder(decoder: JsonDecoder) -> JsonDecoder:
+    """
+    Replace the module-level decoder used by the fetchers.
+
+    Args:
+        decoder (JsonDecoder): The decoder to install.
+
+    Returns:
+        JsonDecoder: The previously installed decoder.
+    """
+    global _json_decoder
+    previous, _json_decoder = _json_decoder, decoder
+    return previous
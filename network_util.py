@@ -0,0 +1,932 @@
+"""
+Network Utility Functions
+=========================
+Author: Udit Kumar Chatterjee
+Email: quantumudit@gmail.com
+=========================
+
+This module provides the building blocks shared by the HTTP clients of
+`scraper_util` and `async_scraper_util`.
+
+Classes:
+--------
+1. UserAgentProvider: Load a user-agent pool once and rotate through it.
+2. LookupCache: Thread-safe TTL cache with size-bounded eviction and optional disk persistence.
+3. RateLimiter: Adaptive per-host token-bucket limiter shared by concurrent workers.
+4. BackoffPolicy: Attempt budget and jittered exponential backoff of one error class.
+5. CircuitBreaker: Thread-safe breaker failing fast while a host keeps failing.
+6. RetryPolicy: Retry layer mapping error classes to backoff policies, built on tenacity.
+7. RetryableStatusError: Raised for responses whose HTTP status is worth retrying.
+8. CircuitOpenError: Raised when a request is refused by an open circuit breaker.
+9. CachedResponse: A response body stored by the response cache with its validators.
+10. ResponseCache: Persistent, size-bounded LRU cache of API responses.
+
+Functions:
+----------
+1. load_user_agents(): Load a pool of user-agent strings.
+2. parse_retry_after(): Parse a Retry-After header into a delay in seconds.
+3. response_cache_key(): Build the response cache key of an endpoint and its parameters.
+"""
+
+
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+from typing import (Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional,
+                    Sequence, Tuple, Type, TypeVar)
+
+from cachetools import TLRUCache
+from fake_useragent import FakeUserAgentError, UserAgent
+from tenacity import AsyncRetrying, RetryCallState, Retrying, retry_if_exception
+
+BUNDLED_USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36 Edg/118.0.2088.46",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:118.0) Gecko/20100101 Firefox/118.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.0; rv:118.0) Gecko/20100101 Firefox/118.0",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:118.0) Gecko/20100101 Firefox/118.0",
+)
+
+UA_STRATEGIES = ("round_robin", "weighted", "sticky")
+
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+BACKOFF_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_STATUS_CODES = BACKOFF_STATUS_CODES | frozenset({408})
+
+T = TypeVar("T")
+
+
+def load_user_agents(use_fake_useragent: bool = False, pool_size: int = 20) -> List[str]:
+    """
+    Load a pool of user-agent strings.
+
+    Args:
+        use_fake_useragent (bool): Whether to sample the pool from the
+            `fake_useragent` browser data instead of the bundled list.
+        pool_size (int): The number of samples drawn from `fake_useragent`.
+
+    Returns:
+        List[str]: The distinct user-agent strings of the pool. Falls back to
+        the bundled list if `fake_useragent` cannot provide any.
+    """
+    if use_fake_useragent:
+        try:
+            user_agent = UserAgent()
+            pool = list(dict.fromkeys(user_agent.random for _ in range(pool_size)))
+            if pool:
+                return pool
+        except FakeUserAgentError:
+            pass
+    return list(BUNDLED_USER_AGENTS)
+
+
+class UserAgentProvider:
+    """
+    A thread-safe provider handing out user-agent strings from a fixed pool.
+
+    The pool is loaded once at construction; every call afterwards is a cheap
+    lookup. Strategies:
+
+    - "round_robin": cycle through the pool in order.
+    - "weighted": draw by `weights` from a seeded, hence reproducible, generator.
+    - "sticky": pin one user agent per key (by default the calling thread, which
+      maps onto the pooled connection that thread reuses).
+
+    Attributes:
+    -----------
+    user_agents: The user-agent pool.
+    strategy: The rotation strategy.
+    """
+
+    def __init__(
+        self,
+        user_agents: Optional[Sequence[str]] = None,
+        strategy: str = "round_robin",
+        weights: Optional[Sequence[float]] = None,
+        seed: Optional[int] = 0,
+    ) -> None:
+        """
+        Args:
+            user_agents (Optional[Sequence[str]]): The pool; defaults to the bundled list.
+            strategy (str): One of "round_robin", "weighted" or "sticky".
+            weights (Optional[Sequence[float]]): The relative weight of each user
+                agent for the "weighted" strategy (uniform if omitted).
+            seed (Optional[int]): The seed of the "weighted" generator.
+        """
+        if strategy not in UA_STRATEGIES:
+            raise ValueError(
+                f"Unknown user-agent strategy {strategy!r}; expected one of {UA_STRATEGIES}")
+        self.user_agents = list(user_agents) if user_agents else list(BUNDLED_USER_AGENTS)
+        if weights is not None and len(weights) != len(self.user_agents):
+            raise ValueError("weights must have one entry per user agent")
+        self.strategy = strategy
+        self._weights = list(weights) if weights is not None else None
+        self._random = random.Random(seed)
+        self._cycle: Iterator[str] = itertools.cycle(self.user_agents)
+        self._sticky: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[Hashable] = None) -> str:
+        """
+        Return the user agent for the next request.
+
+        Args:
+            key (Optional[Hashable]): The identity a "sticky" user agent is pinned
+                to; defaults to the calling thread.
+
+        Returns:
+            str: The user-agent string.
+        """
+        with self._lock:
+            if self.strategy == "round_robin":
+                return next(self._cycle)
+            if self.strategy == "weighted":
+                return self._random.choices(self.user_agents, weights=self._weights)[0]
+            if key is None:
+                key = threading.get_ident()
+            if key not in self._sticky:
+                self._sticky[key] = next(self._cycle)
+            return self._sticky[key]
+
+
+class LookupCache:
+    """
+    A thread-safe TTL cache for JSON-serializable lookups.
+
+    Entries expire `ttl` seconds after they are stored and the least recently
+    used entry is evicted once `maxsize` is reached. Expiry uses wall-clock
+    time, so when `persist_path` is set the entries survive process restarts
+    with their original deadlines.
+
+    Attributes:
+    -----------
+    ttl: The time-to-live of an entry in seconds.
+    persist_path: The JSON file the cache is mirrored to, if any.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600,
+                 persist_path: Optional[str] = None) -> None:
+        """
+        Args:
+            maxsize (int): The maximum number of entries kept.
+            ttl (float): The time-to-live of an entry in seconds.
+            persist_path (Optional[str]): A JSON file to load from and save to.
+        """
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self._cache: TLRUCache = TLRUCache(
+            maxsize=maxsize, ttu=lambda _key, value, _now: value[0], timer=time.time)
+        self._lock = threading.Lock()
+        if persist_path and os.path.exists(persist_path):
+            self._load()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value of a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[Any]: The value, or `None` if missing or expired.
+        """
+        with self._lock:
+            entry: Optional[Tuple[float, Any]] = self._cache.get(key)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a value under a key.
+
+        Args:
+            key (str): The cache key.
+            value (Any): A JSON-serializable value.
+        """
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, value)
+            if self.persist_path:
+                self._save()
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value of a key, calling `loader` to fill a miss.
+
+        Args:
+            key (str): The cache key.
+            loader (Callable[[], Any]): Produces the value on a miss.
+
+        Returns:
+            Any: The cached or freshly loaded value.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry (and the persisted file, if any)."""
+        with self._lock:
+            self._cache.clear()
+            if self.persist_path and os.path.exists(self.persist_path):
+                os.remove(self.persist_path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (expires_at, value) in entries.items():
+            if expires_at > now:
+                self._cache[key] = (expires_at, value)
+
+    def _save(self) -> None:
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(dict(self._cache.items()), cache_file)
+        os.replace(tmp_path, self.persist_path)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header into a delay in seconds.
+
+    Args:
+        value (Optional[str]): The header value, either delay-seconds or an HTTP-date.
+
+    Returns:
+        Optional[float]: The non-negative delay, or `None` if absent or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+@dataclass
+class _HostBucket:
+    rate: float
+    max_rate: float
+    tokens: float
+    updated: float
+    blocked_until: float = 0.0
+
+
+class RateLimiter:
+    """
+    A thread-safe, adaptive token-bucket rate limiter with one bucket per host.
+
+    Each host starts at its configured rate, which is also its ceiling, and
+    allows bursts of up to `burst` requests. The rate adapts to the feedback
+    passed to `record()`:
+
+    - HTTP 429/5xx or a failed request multiplies the rate by `backoff_factor`,
+      and a Retry-After delay pauses the host entirely until it has passed.
+    - A response slower than `target_latency` eases the rate down by 10%.
+    - Any other response raises the rate by `recovery_step` of its ceiling.
+
+    One instance is meant to be shared by every worker of a crawl (or several
+    crawls), so the combined request rate per host stays within the budget.
+
+    Attributes:
+    -----------
+    requests_per_second: The default rate (and ceiling) of a host (0 disables pacing).
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        burst: int = 1,
+        min_rate: float = 0.2,
+        backoff_factor: float = 0.5,
+        recovery_step: float = 0.1,
+        target_latency: float = 2.0,
+        host_rates: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """
+        Args:
+            requests_per_second (float): The default rate (and ceiling) of a host.
+            burst (int): The bucket capacity, i.e. the largest burst allowed.
+            min_rate (float): The floor the rate never backs off below.
+            backoff_factor (float): The multiplier applied to the rate on push-back.
+            recovery_step (float): The fraction of the ceiling regained per fast response.
+            target_latency (float): The response time in seconds above which the rate eases.
+            host_rates (Optional[Dict[str, float]]): Per-host rates overriding the default.
+        """
+        self.requests_per_second = requests_per_second
+        self._burst = burst
+        self._min_rate = min_rate
+        self._backoff_factor = backoff_factor
+        self._recovery_step = recovery_step
+        self._target_latency = target_latency
+        self._host_rates = dict(host_rates or {})
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str, now: float) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self._host_rates.get(host, self.requests_per_second)
+            bucket = self._buckets[host] = _HostBucket(
+                rate=rate, max_rate=rate, tokens=float(self._burst), updated=now)
+        return bucket
+
+    def rate(self, host: str = "") -> float:
+        """
+        Return the current rate of a host.
+
+        Args:
+            host (str): The host name.
+
+        Returns:
+            float: The current requests per second allowed for the host.
+        """
+        with self._lock:
+            return self._bucket(host, time.monotonic()).rate
+
+    def reserve(self, host: str = "") -> float:
+        """
+        Reserve a request slot for a host without waiting for it.
+
+        Args:
+            host (str): The host name.
+
+        Returns:
+            float: The number of seconds the caller must wait before sending.
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            if bucket.rate <= 0 or math.isinf(bucket.rate):
+                return max(0.0, bucket.blocked_until - now)
+            if bucket.updated < bucket.blocked_until:
+                # Restart the bucket when the block lifts with a single token, so
+                # the waiters are spaced from then on instead of all sent at once
+                bucket.updated = bucket.blocked_until
+                bucket.tokens = 1.0
+            bucket.tokens = min(
+                float(self._burst),
+                bucket.tokens + max(0.0, now - bucket.updated) * bucket.rate)
+            bucket.updated = max(bucket.updated, now)
+            bucket.tokens -= 1
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            return bucket.updated - now + wait
+
+    def acquire(self, host: str = "") -> None:
+        """
+        Block until the caller is allowed to send its next request to a host.
+
+        Args:
+            host (str): The host name.
+        """
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, host: str, status_code: Optional[int], latency: float,
+               retry_after: Optional[float] = None) -> None:
+        """
+        Feed the outcome of a request back into the host's rate.
+
+        Args:
+            host (str): The host name.
+            status_code (Optional[int]): The HTTP status, or `None` if the request failed.
+            latency (float): The response time in seconds.
+            retry_after (Optional[float]): The server's Retry-After delay in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            if bucket.rate <= 0:
+                bucket.blocked_until = max(bucket.blocked_until, now + (retry_after or 0.0))
+                return
+            floor = min(self._min_rate, bucket.max_rate)
+            if status_code is None or status_code in BACKOFF_STATUS_CODES:
+                bucket.rate = max(floor, bucket.rate * self._backoff_factor)
+                if retry_after:
+                    bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+            elif latency > self._target_latency:
+                bucket.rate = max(floor, bucket.rate * 0.9)
+            else:
+                bucket.rate = min(
+                    bucket.max_rate, bucket.rate + bucket.max_rate * self._recovery_step)
+
+
+class RetryableStatusError(Exception):
+    """
+    Raised for a response whose HTTP status is worth retrying (see `RETRYABLE_STATUS_CODES`).
+
+    Attributes:
+    -----------
+    status_code: The HTTP status of the response.
+    retry_after: The server's Retry-After delay in seconds, if any.
+    """
+
+    def __init__(self, status_code: int, url: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(f"HTTP {status_code} from {url}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is refused because its circuit breaker is open.
+
+    Attributes:
+    -----------
+    retry_in: The number of seconds until the breaker lets a trial request through.
+    """
+
+    def __init__(self, retry_in: float) -> None:
+        super().__init__(f"Circuit open; retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    """
+    The retry budget of one error class.
+
+    The n-th retry waits a random delay between 0 and
+    `min(max_delay, initial_delay * multiplier ** (n - 1))` ("full jitter"),
+    or the server's Retry-After delay if that is longer.
+
+    Attributes:
+    -----------
+    max_attempts: The total number of attempts, the first one included.
+    initial_delay: The backoff ceiling of the first retry in seconds.
+    max_delay: The largest backoff ceiling in seconds.
+    multiplier: The growth factor of the ceiling per retry.
+    """
+    max_attempts: int = 5
+    initial_delay: float = 0.5
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker shared by the requests of a client.
+
+    After `failure_threshold` consecutive failures the breaker opens and every
+    request is refused with `CircuitOpenError` for `reset_timeout` seconds.
+    It then lets a single trial request through ("half-open"): a success
+    closes the breaker again, a failure re-opens it, and any other outcome
+    (e.g. an error that is not retried) frees the trial slot for the next request.
+
+    Attributes:
+    -----------
+    failure_threshold: The number of consecutive failures that opens the breaker.
+    reset_timeout: The number of seconds the breaker stays open.
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30.0) -> None:
+        """
+        Args:
+            failure_threshold (int): The number of consecutive failures that opens the breaker.
+            reset_timeout (float): The number of seconds the breaker stays open.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The breaker state: "closed", "open" or "half_open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def before_call(self) -> bool:
+        """
+        Admit a request, or refuse it while the breaker is open.
+
+        Returns:
+            bool: Whether the request is the half-open trial, which the caller
+            must release with `release_trial()` if it neither succeeds nor fails.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with its
+                trial request still in flight.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(remaining)
+            if self._trial_in_flight:
+                raise CircuitOpenError(0.0)
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the breaker and reset its failure count."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker once the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Free the half-open trial slot of a request that neither succeeded nor failed."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class RetryPolicy:
+    """
+    A retry layer wrapping every attempt of a request, built on tenacity.
+
+    Errors are matched against `policies` by class (the first matching entry
+    wins); errors of any other class are raised straight away. Retries stop
+    once the matched policy's attempts are used up or `max_elapsed` seconds
+    have passed since the first attempt, and the last error is re-raised.
+
+    While the circuit breaker is open, attempts wait for it to let requests
+    through again rather than failing, within the `max_elapsed` budget. Only
+    failures of retried error classes count against the breaker, except HTTP
+    429 push-back, which is left to the rate limiter.
+
+    Attributes:
+    -----------
+    policies: The backoff policy of each retried error class.
+    max_elapsed: The overall time budget of a request in seconds (`None` for no limit).
+    circuit_breaker: The breaker consulted before every attempt, if any.
+    """
+
+    def __init__(
+        self,
+        policies: Dict[Type[BaseException], BackoffPolicy],
+        max_elapsed: Optional[float] = 300.0,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            policies (Dict[Type[BaseException], BackoffPolicy]): The backoff policy of
+                each retried error class; an empty mapping disables retries.
+            max_elapsed (Optional[float]): The overall time budget of a request in seconds.
+            circuit_breaker (Optional[CircuitBreaker]): The breaker consulted before
+                every attempt; its `failure_threshold` must exceed the attempts of
+                every policy, so a single failing request cannot open it.
+            seed (Optional[int]): The seed of the jitter generator.
+
+        Raises:
+            ValueError: If the breaker would open within one request's attempts.
+        """
+        max_attempts = max((policy.max_attempts for policy in policies.values()), default=0)
+        if circuit_breaker is not None and circuit_breaker.failure_threshold <= max_attempts:
+            raise ValueError(
+                f"The circuit breaker threshold ({circuit_breaker.failure_threshold}) must "
+                f"exceed the largest attempt budget ({max_attempts})")
+        self.policies = dict(policies)
+        self.max_elapsed = max_elapsed
+        self.circuit_breaker = circuit_breaker
+        self._random = random.Random(seed)
+
+    def policy_for(self, error: BaseException) -> Optional[BackoffPolicy]:
+        """
+        Return the backoff policy of an error.
+
+        Args:
+            error (BaseException): The error raised by an attempt.
+
+        Returns:
+            Optional[BackoffPolicy]: The matching policy, or `None` if the error is not retried.
+        """
+        for error_class, policy in self.policies.items():
+            if isinstance(error, error_class):
+                return policy
+        return None
+
+    def call(self, func: Callable[[], T]) -> T:
+        """
+        Call `func`, retrying it according to the policy.
+
+        Args:
+            func (Callable[[], T]): The request to attempt.
+
+        Returns:
+            T: The result of the first successful attempt.
+        """
+        retrying = Retrying(
+            retry=retry_if_exception(self._is_retried), stop=self._stop,
+            wait=self._wait, reraise=True)
+        return retrying(self._attempt, func, self._deadline())
+
+    async def acall(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `func()`, retrying it according to the policy.
+
+        Args:
+            func (Callable[[], Awaitable[T]]): The coroutine function of the request.
+
+        Returns:
+            T: The result of the first successful attempt.
+        """
+        retrying = AsyncRetrying(
+            retry=retry_if_exception(self._is_retried), stop=self._stop,
+            wait=self._wait, reraise=True)
+        return await retrying(self._async_attempt, func, self._deadline())
+
+    def _deadline(self) -> Optional[float]:
+        if self.max_elapsed is None:
+            return None
+        return time.monotonic() + self.max_elapsed
+
+    def _breaker_wait(self, error: CircuitOpenError, deadline: Optional[float]) -> float:
+        # Poll shortly while another request holds the half-open trial slot
+        wait = max(error.retry_in, 0.1)
+        if deadline is not None and time.monotonic() + wait > deadline:
+            raise error
+        return wait
+
+    def _attempt(self, func: Callable[[], T], deadline: Optional[float]) -> T:
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return func()
+        while True:
+            try:
+                is_trial = breaker.before_call()
+                break
+            except CircuitOpenError as error:
+                time.sleep(self._breaker_wait(error, deadline))
+        try:
+            result = func()
+        except Exception as error:
+            self._record_error(breaker, error)
+            raise
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            if is_trial:
+                breaker.release_trial()
+
+    async def _async_attempt(self, func: Callable[[], Awaitable[T]],
+                             deadline: Optional[float]) -> T:
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return await func()
+        while True:
+            try:
+                is_trial = breaker.before_call()
+                break
+            except CircuitOpenError as error:
+                await asyncio.sleep(self._breaker_wait(error, deadline))
+        try:
+            result = await func()
+        except Exception as error:
+            self._record_error(breaker, error)
+            raise
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            if is_trial:
+                breaker.release_trial()
+
+    def _record_error(self, breaker: CircuitBreaker, error: BaseException) -> None:
+        # Rate-limit push-back says nothing about the health of the host
+        if self._is_retried(error) and getattr(error, "status_code", None) != 429:
+            breaker.record_failure()
+
+    def _is_retried(self, error: BaseException) -> bool:
+        return self.policy_for(error) is not None
+
+    def _stop(self, retry_state: RetryCallState) -> bool:
+        if (self.max_elapsed is not None
+                and retry_state.seconds_since_start >= self.max_elapsed):
+            return True
+        policy = self.policy_for(retry_state.outcome.exception())
+        return policy is None or retry_state.attempt_number >= policy.max_attempts
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        error = retry_state.outcome.exception()
+        policy = self.policy_for(error)
+        ceiling = min(policy.max_delay,
+                      policy.initial_delay * policy.multiplier ** (retry_state.attempt_number - 1))
+        delay = max(self._random.uniform(0, ceiling), getattr(error, "retry_after", None) or 0.0)
+        if self.max_elapsed is not None:
+            delay = min(delay, max(0.0, self.max_elapsed - retry_state.seconds_since_start))
+        return delay
+
+
+_RESPONSE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL
+)
+"""
+
+
+def response_cache_key(endpoint: str, params: Sequence[Tuple[str, str]]) -> str:
+    """
+    Build the response cache key of an endpoint and its query parameters.
+
+    Args:
+        endpoint (str): The endpoint path.
+        params (Sequence[Tuple[str, str]]): The query parameters, in any order.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"{endpoint}?{urlencode(sorted(params))}"
+
+
+@dataclass
+class CachedResponse:
+    """
+    A response body stored by `ResponseCache`.
+
+    Attributes:
+    -----------
+    body: The response body.
+    etag: The ETag validator of the response, if any.
+    last_modified: The Last-Modified validator of the response, if any.
+    fresh: Whether the entry is within its TTL and can be used without revalidation.
+    stored_at: The Unix time the entry was stored or last revalidated.
+    """
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+    stored_at: float
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Return the conditional request headers revalidating the entry.
+
+        Returns:
+            Dict[str, str]: The If-None-Match / If-Modified-Since headers.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    A thread-safe, persistent cache of API response bodies backed by SQLite.
+
+    An entry is served as is for `ttl` seconds after it was stored or last
+    revalidated. Past that, an entry carrying an ETag or Last-Modified
+    validator is revalidated with a conditional request, so an unchanged page
+    costs a bodiless 304 instead of a full download; an entry without
+    validators is treated as a miss. Once `max_entries` is exceeded the least
+    recently used entries are evicted.
+
+    Attributes:
+    -----------
+    path: The SQLite database file (":memory:" for a per-process cache).
+    ttl: The number of seconds an entry is served without revalidation.
+    max_entries: The maximum number of entries kept.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, max_entries: int = 10_000) -> None:
+        """
+        Args:
+            path (str): The SQLite database file, created if missing.
+            ttl (float): The number of seconds an entry is served without revalidation.
+            max_entries (int): The maximum number of entries kept.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_RESPONSE_CACHE_SCHEMA)
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Look up a response, marking it as recently used.
+
+        Args:
+            key (str): The cache key, see `response_cache_key()`.
+
+        Returns:
+            Optional[CachedResponse]: The entry, or `None` on a miss (including a
+            stale entry that cannot be revalidated).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            body, etag, last_modified, stored_at = row
+            fresh = now - stored_at < self.ttl
+            if not fresh and not (etag or last_modified):
+                return None
+            self._connection.execute(
+                "UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+        return CachedResponse(body=body, etag=etag, last_modified=last_modified, fresh=fresh,
+                              stored_at=stored_at)
+
+    def put(self, key: str, body: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """
+        Store a response, evicting the least recently used entries if needed.
+
+        Args:
+            key (str): The cache key, see `response_cache_key()`.
+            body (str): The response body.
+            etag (Optional[str]): The ETag header of the response.
+            last_modified (Optional[str]): The Last-Modified header of the response.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now, now))
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+            self._connection.commit()
+
+    def revalidated(self, key: str) -> None:
+        """
+        Restart the TTL of an entry the server confirmed unchanged (HTTP 304).
+
+        Args:
+            key (str): The cache key, see `response_cache_key()`.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET stored_at = ?, used_at = ? WHERE key = ?",
+                (now, now, key))
+            self._connection.commit()
+
+    def discard(self, key: str) -> None:
+        """
+        Drop an entry, e.g. a body that turned out to be malformed.
+
+        Args:
+            key (str): The cache key, see `response_cache_key()`.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._connection.commit()
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
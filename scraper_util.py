@@ -9,6 +9,12 @@ This module provides a class retrieving book data from the Ebooks API.
 The functions defined is used to fetch and manipulate book data
 from the Ebooks API in a convenient way.
 
+Classes:
+--------
+1. EbooksClient: Pooled, keep-alive HTTP client shared by all fetchers.
+2. SubjectMenu: Indexed category/subject/topic tree of the Ebooks menu.
+3. BooksPage: One page of search results with its result metadata.
+
 Functions:
 ----------
 1. parse_books_details(): Parse book details and return as a dictionary.
@@ -16,15 +22,82 @@ Functions:
 3. get_topics_for_subject(): Retrieve topics for a given subject ID.
 4. fetch_total_books_count(): Retrieve the total number of books for a subject.
 5. fetch_books_data(): Retrieve books data for a page and subject.
+6. get_client(): Return the module-level client used by the fetchers.
+7. set_client(): Replace the module-level client (e.g. for a local test server).
+8. menu_params(): Build the query parameters of the subject menu endpoint.
+9. search_params(): Build the query parameters of the subject search endpoint.
+10. fetch_pages(): Fetch many pages of a subject concurrently, in page order.
+11. crawl_pages(): Crawl every page of a subject concurrently, in page order.
+12. parse_subject_menu(): Parse every category of the root menu in one pass.
+13. load_subject_menu(): Load the category/subject/topic tree with one request.
+14. fetch_subject_menu(): Retrieve a subject menu response through the menu cache.
+15. get_menu_cache(): Return the cache shared by the menu and topic lookups.
+16. set_menu_cache(): Replace (or disable) the menu and topic lookup cache.
+17. menu_cache_key(): Build the menu cache key of a subject.
+18. fetch_books_page(): Retrieve a page of books together with the result metadata.
+19. parse_books_page(): Build a BooksPage from a decoded search response.
+20. iter_books(): Lazily crawl a subject, yielding parsed book records.
+21. parse_books_batch(): Parse a batch of books straight into columns.
+22. iter_book_batches(): Lazily crawl a subject, yielding each page as columns.
+23. check_response(): Raise for an error status of a response.
+24. crawl_new_pages(): Crawl a subject, keeping only new or changed books of each page.
+25. map_ordered(): Map a function over a bounded thread pool, yielding results in order.
+26. crawl_subjects(): Crawl many subjects at once, interleaving their pages fairly.
+27. iter_subjects_book_batches(): Crawl many subjects into one deduplicated stream of columns.
+28. decode_books_page(): Decode a raw search response straight into columns.
+29. iter_book_batches_parallel(): Crawl a subject, decoding and parsing pages in a process pool.
+30. parse_book(): Parse the details of a book into a Book record.
+31. decode_book_records(): Decode a raw search response straight into typed book records.
+32. book_records_to_columns(): Turn book records into columns.
+33. book_record_to_dict(): Turn a book record into a dictionary.
 """
 
 
-from dataclasses import asdict, dataclass
-from typing import Any, Dict, List, Optional
-from urllib.parse import urljoin
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields, replace
+from datetime import datetime
+from operator import attrgetter
+from typing import (TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List,
+                    Optional, Set, Tuple, TypeVar, Union)
+from urllib.parse import urljoin, urlparse
 
 import requests
-from fake_useragent import UserAgent
+from requests.adapters import HTTPAdapter
+
+from json_util import SchemaMismatchError, get_json_decoder, msgspec
+from network_util import (DEFAULT_REQUESTS_PER_SECOND, RETRYABLE_STATUS_CODES, BackoffPolicy,
+                          CircuitBreaker, LookupCache, RateLimiter, ResponseCache,
+                          RetryableStatusError, RetryPolicy, UserAgentProvider,
+                          parse_retry_after, response_cache_key)
+
+if TYPE_CHECKING:
+    from checkpoint_util import CrawlCheckpoint, SeenBooksIndex
+
+WEBSITE_URL = "https://www.ebooks.com/"
+WEBSITE_ORIGIN = WEBSITE_URL.rstrip("/")
+SUBJECT_MENU_ENDPOINT = "api/subject/menu/"
+SUBJECT_SEARCH_ENDPOINT = "api/search/subject/"
+ROOT_SUBJECT_ID = 184
+COUNTRY_CODE = "US"
+MENU_SECTION_CATEGORIES = {1: "Popular Subjects", 2: "Fiction", 3: "Non-Fiction"}
+
+DEFAULT_MAX_WORKERS = 4
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Ordered most specific first: RetryPolicy uses the first matching error class
+DEFAULT_RETRY_POLICIES = {
+    RetryableStatusError: BackoffPolicy(max_attempts=6, initial_delay=1.0, max_delay=60.0),
+    requests.Timeout: BackoffPolicy(max_attempts=4, initial_delay=1.0, max_delay=30.0),
+    requests.ConnectionError: BackoffPolicy(max_attempts=5, initial_delay=0.5, max_delay=30.0),
+    requests.exceptions.ChunkedEncodingError: BackoffPolicy(max_attempts=3),
+    ValueError: BackoffPolicy(max_attempts=3, initial_delay=1.0, max_delay=10.0),
+}
 
 
 @dataclass
@@ -49,6 +122,11 @@ class Book:
     book_url: The URL of the book.
     book_image_url: The URL of the book's image.
     """
+    __slots__ = (
+        "book_id", "book_title", "book_subtitle", "book_description", "publisher",
+        "edition", "publication_date", "publication_month_year", "publication_year",
+        "price", "prime_authors", "num_authors", "book_url", "book_image_url")
+
     book_id: Optional[str]
     book_title: Optional[str]
     book_subtitle: Optional[str]
@@ -65,6 +143,528 @@ class Book:
     book_image_url: Optional[str]
 
 
+BOOK_FIELDS = tuple(book_field.name for book_field in fields(Book))
+STORE_FIELDS = BOOK_FIELDS + ("scrape_timestamp",)
+ENCODED_FIELDS = ("publisher", "edition", "publication_month_year", "prime_authors")
+
+# The subject search response key every `Book` attribute is decoded from
+BOOK_SOURCE_KEYS = {
+    "book_id": "id",
+    "book_title": "title",
+    "book_subtitle": "subtitle",
+    "book_description": "description",
+    "publisher": "publisher",
+    "edition": "edition",
+    "publication_date": "on_sale_date",
+    "publication_month_year": "short_publication_date",
+    "publication_year": "publication_year",
+    "price": "price",
+    "prime_authors": "authors",
+    "num_authors": "num_authors",
+    "book_url": "book_url",
+    "book_image_url": "image_url",
+}
+
+
+def _absolute_book_url(book_url: Optional[str]) -> str:
+    # Site-relative paths are by far the common case; avoid urljoin for them
+    if book_url and book_url[0] == "/" and book_url[:2] != "//":
+        return WEBSITE_ORIGIN + book_url
+    return urljoin(WEBSITE_URL, book_url)
+
+
+def _join_author_names(names: List[Optional[str]]) -> str:
+    joined = ", ".join(names)
+    return joined if joined else "Unknown"
+
+
+if msgspec is not None:
+    class _AuthorRecord(msgspec.Struct, gc=False):
+        name: Optional[str] = None
+
+    def _finish_book_record(record: Any) -> None:
+        # Run by msgspec once a record is validated: join the decoded authors
+        # into a string in place and absolutize the URL, as parse_book() does
+        authors = record.prime_authors
+        record.prime_authors = _join_author_names(
+            [author.name for author in authors] if authors else [])
+        record.book_url = _absolute_book_url(record.book_url)
+
+    # A compact `Book` decoded straight from a search response: the fields keep
+    # the types of `Book`, are renamed from their raw keys and the whole page is
+    # validated in one pass, without building an intermediate dict per book
+    _BookRecord = msgspec.defstruct(
+        "_BookRecord",
+        [(book_field.name,
+          Optional[List[_AuthorRecord]] if book_field.name == "prime_authors" else book_field.type,
+          None)
+         for book_field in fields(Book)],
+        namespace={"__post_init__": _finish_book_record},
+        rename=BOOK_SOURCE_KEYS, module=__name__, gc=False)
+
+    class _SearchPageRecord(msgspec.Struct, gc=False):
+        books: Optional[List[_BookRecord]] = None
+        total_results: Union[int, str, None] = None
+
+
+@dataclass
+class SubjectMenu:
+    """
+    A class to represent the category/subject/topic tree of the Ebooks menu.
+
+    Attributes:
+    -----------
+    categories: The subjects of each category, keyed by category name.
+    subject_ids: The IDs of all subjects across categories, keyed by subject name.
+    topics: The topics of each subject loaded so far, keyed by subject ID.
+    """
+    categories: Dict[str, Dict[str, int]]
+    subject_ids: Dict[str, int]
+    topics: Dict[int, Dict[str, int]] = field(default_factory=dict)
+
+    def subjects(self, category: str) -> Dict[str, int]:
+        """
+        Return the subjects of a category.
+
+        Args:
+            category (str): The name of the category.
+
+        Returns:
+            Dict[str, int]: The subject IDs keyed by subject name.
+        """
+        return self.categories.get(category, {})
+
+    def topics_for(self, subject_id: int) -> Dict[str, int]:
+        """
+        Return the topics of a subject, loading them on first access.
+
+        Args:
+            subject_id (int): The ID of the subject.
+
+        Returns:
+            Dict[str, int]: The topic IDs keyed by topic name.
+        """
+        if subject_id not in self.topics:
+            self.topics[subject_id] = get_topics_for_subject(subject_id)
+        return self.topics[subject_id]
+
+    def category_topic_ids(self, category: str,
+                           max_workers: int = DEFAULT_MAX_WORKERS) -> List[int]:
+        """
+        Return the IDs to crawl to cover a whole category: the topics of each
+        of its subjects, or the subject itself if it has no topics.
+
+        Args:
+            category (str): The name of the category.
+            max_workers (int): The maximum number of concurrent topic requests.
+
+        Returns:
+            List[int]: The IDs, without duplicates, in menu order.
+        """
+        subject_ids = list(dict.fromkeys(self.subjects(category).values()))
+        missing = [subject_id for subject_id in subject_ids if subject_id not in self.topics]
+        self.topics.update(zip(
+            missing, map_ordered(get_topics_for_subject, missing, max_workers=max_workers)))
+        topic_ids: List[int] = []
+        for subject_id in subject_ids:
+            topic_ids.extend(self.topics[subject_id].values() or [subject_id])
+        return list(dict.fromkeys(topic_ids))
+
+
+@dataclass
+class BooksPage:
+    """
+    A class to represent one page of the subject search results.
+
+    Attributes:
+    -----------
+    subject_id: The ID of the subject the page belongs to.
+    page_num: The page number.
+    books: The books of the page, parsed into `Book` records (or, with msgspec,
+        into typed records with the same attributes).
+    total_results: The total number of books of the subject.
+    page_size: The number of books on the page.
+    fetched_at: The time the page was fetched, shared by all its books.
+    """
+    subject_id: int
+    page_num: int
+    books: List[Any]
+    total_results: int
+    page_size: int
+    fetched_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def total_pages(self) -> int:
+        """The number of pages of the subject, assuming this page is a full one."""
+        if self.page_size == 0:
+            return 0
+        return math.ceil(self.total_results / self.page_size)
+
+
+class EbooksClient:
+    """
+    A pooled HTTP client for the Ebooks API.
+
+    A single `requests.Session` is kept alive for the lifetime of the client,
+    so repeated calls reuse TCP/TLS connections instead of opening a new one
+    per request.
+
+    Attributes:
+    -----------
+    base_url: The root URL the API endpoints are resolved against.
+    timeout: The per-request timeout in seconds.
+    session: The underlying `requests.Session`.
+    user_agents: The provider of the per-request User-Agent header.
+    rate_limiter: The default limiter pacing requests per host, if any.
+    retry_policy: The retry layer wrapped around every request.
+    response_cache: The persistent cache of decoded JSON responses, if any.
+    """
+
+    def __init__(
+        self,
+        base_url: str = WEBSITE_URL,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        timeout: float = 100,
+        session: Optional[requests.Session] = None,
+        user_agents: Optional[UserAgentProvider] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        """
+        Args:
+            base_url (str): The root URL of the API (override to target a local server).
+            pool_connections (int): The number of per-host connection pools to cache.
+            pool_maxsize (int): The maximum number of connections kept per host.
+            pool_block (bool): Whether to block when a host's pool is exhausted
+                instead of opening a throwaway connection.
+            timeout (float): The per-request timeout in seconds.
+            session (Optional[requests.Session]): An existing session to use.
+            user_agents (Optional[UserAgentProvider]): The user-agent provider;
+                defaults to round-robin over the bundled list.
+            rate_limiter (Optional[RateLimiter]): The limiter used for requests
+                that are not given one explicitly; `None` sends them unpaced.
+            retry_policy (Optional[RetryPolicy]): The retry layer; defaults to
+                `DEFAULT_RETRY_POLICIES` behind a circuit breaker. Pass a policy
+                without error classes to disable retries.
+            response_cache (Optional[ResponseCache]): The cache consulted by
+                `get_json()`; `None` always downloads.
+        """
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(
+            DEFAULT_RETRY_POLICIES, circuit_breaker=CircuitBreaker())
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.timeout = timeout
+        self.session = session if session is not None else requests.Session()
+        self.user_agents = user_agents if user_agents is not None else UserAgentProvider()
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"accept-language": "en-US"})
+
+    def send(self, endpoint: str, params: List[Tuple[str, str]],
+             rate_limiter: Optional[RateLimiter] = None,
+             headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Send a single GET request to an API endpoint over the pooled session.
+
+        When a rate limiter applies, the request waits for its host's slot and
+        its outcome (status, latency, Retry-After) is fed back into the limiter.
+
+        Args:
+            endpoint (str): The endpoint path relative to `base_url`.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter to use instead of
+                the client's default one.
+            headers (Optional[Dict[str, str]]): Extra request headers, e.g.
+                conditional request validators.
+
+        Returns:
+            requests.Response: The successful (or 304 Not Modified) response.
+
+        Raises:
+            RetryableStatusError: If the status is one of `RETRYABLE_STATUS_CODES`.
+            requests.HTTPError: If the status is any other error status.
+        """
+        url = urljoin(self.base_url, endpoint)
+        headers = {**(headers or {}), "User-Agent": self.user_agents.get()}
+        limiter = rate_limiter if rate_limiter is not None else self.rate_limiter
+        if limiter is None:
+            response = self.session.get(
+                url=url, headers=headers, params=params, timeout=self.timeout)
+            return check_response(response)
+
+        host = urlparse(url).netloc
+        limiter.acquire(host)
+        started = time.monotonic()
+        try:
+            response = self.session.get(
+                url=url, headers=headers, params=params, timeout=self.timeout)
+        except requests.RequestException:
+            limiter.record(host, None, time.monotonic() - started)
+            raise
+        limiter.record(
+            host, response.status_code, time.monotonic() - started,
+            parse_retry_after(response.headers.get("Retry-After")))
+        return check_response(response)
+
+    def get(self, endpoint: str, params: List[Tuple[str, str]],
+            rate_limiter: Optional[RateLimiter] = None) -> requests.Response:
+        """
+        Send a GET request to an API endpoint, retrying it per `retry_policy`.
+
+        Args:
+            endpoint (str): The endpoint path relative to `base_url`.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter to use instead of
+                the client's default one.
+
+        Returns:
+            requests.Response: The successful response of the request.
+        """
+        return self.retry_policy.call(lambda: self.send(endpoint, params, rate_limiter))
+
+    def get_json(self, endpoint: str, params: List[Tuple[str, str]],
+                 rate_limiter: Optional[RateLimiter] = None,
+                 decode: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """
+        Send a GET request to an API endpoint and decode the JSON body.
+
+        Decoding is part of each attempt, so a truncated or non-JSON body is
+        retried like any other transient failure. With a response cache, a
+        fresh entry is returned without a request and a stale one is
+        revalidated with a conditional request.
+
+        Args:
+            endpoint (str): The endpoint path relative to `base_url`.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter to use instead of
+                the client's default one.
+            decode (Optional[Callable[[bytes], Any]]): The decoder of the body,
+                e.g. a schema-driven one; defaults to `get_json_decoder().loads`.
+
+        Returns:
+            Any: The decoded JSON payload.
+        """
+        return self.get_dated(endpoint, params, rate_limiter, decode)[0]
+
+    def get_dated(self, endpoint: str, params: List[Tuple[str, str]],
+                  rate_limiter: Optional[RateLimiter] = None,
+                  decode: Optional[Callable[[bytes], Any]] = None) -> Tuple[Any, datetime]:
+        """
+        Send a GET request to an API endpoint and decode the body as `get_json()`
+        does, together with the time the body was fetched.
+
+        A body served fresh from the response cache is dated by when it was
+        stored (or last revalidated), not by when it was read.
+
+        Args:
+            endpoint (str): The endpoint path relative to `base_url`.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter to use instead of
+                the client's default one.
+            decode (Optional[Callable[[bytes], Any]]): The decoder of the body;
+                defaults to `get_json_decoder().loads`.
+
+        Returns:
+            Tuple[Any, datetime]: The decoded body and its fetch time.
+        """
+        if decode is None:
+            decode = get_json_decoder().loads
+        cache = self.response_cache
+        key = response_cache_key(endpoint, params)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None and cached.fresh:
+            return decode(cached.body.encode("utf-8")), datetime.fromtimestamp(cached.stored_at)
+
+        def attempt() -> Tuple[Any, datetime]:
+            response = self.send(endpoint, params, rate_limiter,
+                                 cached.validators() if cached is not None else None)
+            fetched_at = datetime.now()
+            if response.status_code == 304 and cached is not None:
+                cache.revalidated(key)
+                return decode(cached.body.encode("utf-8")), fetched_at
+            body = decode(response.content)
+            if cache is not None:
+                cache.put(key, response.text, response.headers.get("ETag"),
+                          response.headers.get("Last-Modified"))
+            return body, fetched_at
+
+        return self.retry_policy.call(attempt)
+
+    def get_content(self, endpoint: str, params: List[Tuple[str, str]],
+                    rate_limiter: Optional[RateLimiter] = None) -> bytes:
+        """
+        Send a GET request to an API endpoint and return the raw body, e.g. to
+        decode it in another process.
+
+        Retries and the response cache apply as for `get_json()`, except that
+        a malformed body is not detected, hence not retried.
+
+        Args:
+            endpoint (str): The endpoint path relative to `base_url`.
+            params (List[Tuple[str, str]]): The query parameters.
+            rate_limiter (Optional[RateLimiter]): The limiter to use instead of
+                the client's default one.
+
+        Returns:
+            bytes: The response body.
+        """
+        return self.get_dated(endpoint, params, rate_limiter, bytes)[0]
+
+    def close(self) -> None:
+        """Close the underlying session and release its pooled connections."""
+        self.session.close()
+
+
+def check_response(response: requests.Response) -> requests.Response:
+    """
+    Raise for an error status of a response.
+
+    Args:
+        response (requests.Response): The response to check.
+
+    Returns:
+        requests.Response: The response, if its status is not an error.
+
+    Raises:
+        RetryableStatusError: If the status is one of `RETRYABLE_STATUS_CODES`.
+        requests.HTTPError: If the status is any other error status.
+    """
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        raise RetryableStatusError(
+            response.status_code, response.url,
+            parse_retry_after(response.headers.get("Retry-After")))
+    response.raise_for_status()
+    return response
+
+
+_client = EbooksClient()
+
+
+def get_client() -> EbooksClient:
+    """
+    Return the module-level client used by every fetch function.
+
+    Returns:
+        EbooksClient: The shared client.
+    """
+    return _client
+
+
+def set_client(client: EbooksClient) -> EbooksClient:
+    """
+    Replace the module-level client used by every fetch function.
+
+    Args:
+        client (EbooksClient): The client to install, e.g. one pointing at a
+            local stand-in server or with a different pool size.
+
+    Returns:
+        EbooksClient: The previously installed client.
+    """
+    global _client
+    previous, _client = _client, client
+    return previous
+
+
+_menu_cache: Optional[LookupCache] = LookupCache()
+
+
+def get_menu_cache() -> Optional[LookupCache]:
+    """
+    Return the cache shared by the subject menu and topic lookups.
+
+    Returns:
+        Optional[LookupCache]: The shared cache, or `None` if caching is disabled.
+    """
+    return _menu_cache
+
+
+def set_menu_cache(cache: Optional[LookupCache]) -> Optional[LookupCache]:
+    """
+    Replace the cache shared by the subject menu and topic lookups.
+
+    Args:
+        cache (Optional[LookupCache]): The cache to install, or `None` to disable caching.
+
+    Returns:
+        Optional[LookupCache]: The previously installed cache.
+    """
+    global _menu_cache
+    previous, _menu_cache = _menu_cache, cache
+    return previous
+
+
+def fetch_subject_menu(subject_id: int) -> Dict[str, Any]:
+    """
+    Retrieve the subject menu response for a subject, through the menu cache.
+
+    Args:
+        subject_id (int): The ID of the subject (the root menu is `ROOT_SUBJECT_ID`).
+
+    Returns:
+        Dict[str, Any]: The decoded subject menu response.
+    """
+    def load() -> Dict[str, Any]:
+        return get_client().get_json(SUBJECT_MENU_ENDPOINT, menu_params(subject_id))
+
+    cache = _menu_cache
+    if cache is None:
+        return load()
+    return cache.get_or_load(menu_cache_key(subject_id), load)
+
+
+def menu_cache_key(subject_id: int) -> str:
+    """
+    Build the menu cache key of a subject.
+
+    Args:
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"{SUBJECT_MENU_ENDPOINT}?subjectID={subject_id}&CountryCode={COUNTRY_CODE}"
+
+
+def menu_params(subject_id: int) -> List[Tuple[str, str]]:
+    """
+    Build the query parameters of the subject menu endpoint.
+
+    Args:
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        List[Tuple[str, str]]: The query parameters.
+    """
+    return [("CountryCode", COUNTRY_CODE), ("subjectID", str(subject_id))]
+
+
+def search_params(page_num: int, subject_id: int) -> List[Tuple[str, str]]:
+    """
+    Build the query parameters of the subject search endpoint.
+
+    Args:
+        page_num (int): The page number to request.
+        subject_id (int): The ID of the subject.
+
+    Returns:
+        List[Tuple[str, str]]: The query parameters.
+    """
+    return [
+        ("pageNumber", str(page_num)),
+        ("CountryCode", COUNTRY_CODE),
+        ("subjectID", str(subject_id))]
+
+
 def parse_books_details(book: Dict[str, Any]) -> Dict[str, Any]:
     """
     Parse the details of a book and return them as a dictionary.
@@ -75,31 +675,107 @@ def parse_books_details(book: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: A dictionary containing the parsed details of the book.
     """
-    website_url = "https://www.ebooks.com/"
-    authors_data = book.get("authors")
-    authors = ", ".join([author.get("name")
-                        for author in authors_data]) if authors_data else ""
-
-    book_url = urljoin(website_url, book.get("book_url"))
-
-    book_details = Book(
-        book_id=book.get("id"),
-        book_title=book.get("title"),
-        book_subtitle=book.get("subtitle"),
-        book_description=book.get("description"),
-        publisher=book.get("publisher"),
-        edition=book.get("edition"),
-        publication_date=book.get("on_sale_date"),
-        publication_month_year=book.get("short_publication_date"),
-        publication_year=book.get("publication_year"),
-        price=book.get("price"),
-        prime_authors=authors if authors else "Unknown",
-        num_authors=book.get("num_authors"),
-        book_url=book_url,
-        book_image_url=book.get("image_url")
-    )
-
-    return asdict(book_details)
+    return asdict(parse_book(book))
+
+
+def parse_book(book: Dict[str, Any]) -> Book:
+    """
+    Parse the details of a book into a `Book` record.
+
+    Args:
+        book (Dict[str, Any]): A dictionary containing the details of the book.
+
+    Returns:
+        Book: The parsed details of the book.
+    """
+    values = {name: book.get(key) for name, key in BOOK_SOURCE_KEYS.items()}
+    authors = values["prime_authors"]
+    values["prime_authors"] = _join_author_names(
+        [author.get("name") for author in authors] if authors else [])
+    values["book_url"] = _absolute_book_url(values["book_url"])
+    return Book(**values)
+
+
+def parse_books_batch(books: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Parse a batch of books into columns, one list per `Book` attribute.
+
+    Produces the same values as `parse_books_details()` without building a
+    `Book` and deep-copying it for every record.
+
+    Args:
+        books (Iterable[Dict[str, Any]]): The raw books data of one or more pages.
+
+    Returns:
+        Dict[str, List[Any]]: The parsed values keyed by `BOOK_FIELDS`.
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name in BOOK_FIELDS}
+    copied = [(columns[name].append, key) for name, key in BOOK_SOURCE_KEYS.items()
+              if name not in ("prime_authors", "book_url")]
+    add_authors, authors_key = columns["prime_authors"].append, BOOK_SOURCE_KEYS["prime_authors"]
+    add_url, url_key = columns["book_url"].append, BOOK_SOURCE_KEYS["book_url"]
+
+    for book in books:
+        get = book.get
+        for add, key in copied:
+            add(get(key))
+        authors = get(authors_key)
+        add_authors(_join_author_names(
+            [author.get("name") for author in authors] if authors else []))
+        add_url(_absolute_book_url(get(url_key)))
+
+    return columns
+
+
+def _parse_book_records(books: Iterable[Dict[str, Any]]) -> List[Book]:
+    # Positional construction from the batch columns is far cheaper than parse_book()
+    columns = parse_books_batch(books)
+    return list(map(Book, *(columns[name] for name in BOOK_FIELDS)))
+
+
+def parse_subject_menu(payload: Dict[str, Any]) -> SubjectMenu:
+    """
+    Parse every category section of the root subject menu in a single pass.
+
+    Args:
+        payload (Dict[str, Any]): The decoded root subject menu response.
+
+    Returns:
+        SubjectMenu: The category/subject tree (topics are loaded lazily).
+    """
+    categories: Dict[str, Dict[str, int]] = {}
+    subject_ids: Dict[str, int] = {}
+    for item_idx, section in enumerate(payload["subject_menus"]):
+        category = MENU_SECTION_CATEGORIES.get(item_idx)
+        if category is None:
+            continue
+        subjects = {entry["subject_name"]: entry["id"]
+                    for entry in section["subject_menu_entries"]}
+        categories[category] = subjects
+        subject_ids.update(subjects)
+    return SubjectMenu(categories=categories, subject_ids=subject_ids)
+
+
+def load_subject_menu(include_topics: bool = False,
+                      max_workers: int = DEFAULT_MAX_WORKERS) -> SubjectMenu:
+    """
+    Load the category/subject tree from a single root menu request.
+
+    Args:
+        include_topics (bool): Whether to eagerly load the topics of every subject.
+        max_workers (int): The maximum number of concurrent topic requests.
+
+    Returns:
+        SubjectMenu: The indexed category/subject/topic tree.
+    """
+    menu = parse_subject_menu(fetch_subject_menu(ROOT_SUBJECT_ID))
+    if include_topics:
+        subject_ids = list(set(menu.subject_ids.values()))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for subject_id, topics in zip(
+                    subject_ids, executor.map(get_topics_for_subject, subject_ids)):
+                menu.topics[subject_id] = topics
+    return menu
 
 
 def get_category_subjects() -> List[Dict[str, int]]:
@@ -111,25 +787,7 @@ def get_category_subjects() -> List[Dict[str, int]]:
         Each dictionary contains the subject name as the key
         and the subject ID as the value.
     """
-    def fetch_category_subjects(item_idx: int) -> Dict[str, int]:
-        params = [("CountryCode", "US"), ("subjectID", 184)]
-        api_base_url = "https://www.ebooks.com/api/subject/menu/"
-        user_agent = UserAgent()
-        dynamic_ua_headers = {
-            "User-Agent": user_agent.random, "accept-language": "en-US"}
-        timeout = 100
-
-        response = requests.get(
-            url=api_base_url, headers=dynamic_ua_headers, params=params, timeout=timeout)
-        subject_entries = response.json(
-        )["subject_menus"][item_idx]["subject_menu_entries"]
-        return {entry["subject_name"]: entry["id"] for entry in subject_entries}
-
-    popular_cat_dict = fetch_category_subjects(item_idx=1)
-    fiction_cat_dict = fetch_category_subjects(item_idx=2)
-    non_fiction_cat_dict = fetch_category_subjects(item_idx=3)
-
-    return [popular_cat_dict, fiction_cat_dict, non_fiction_cat_dict]
+    return list(load_subject_menu().categories.values())
 
 
 def get_topics_for_subject(subject_id: int) -> Dict[str, int]:
@@ -143,46 +801,74 @@ def get_topics_for_subject(subject_id: int) -> Dict[str, int]:
         Each topic name is a key and the corresponding topic ID is the value.
     """
     def fetch_topics(subject_id: int) -> Dict[str, int]:
-        params = [("CountryCode", "US"), ("subjectID", str(subject_id))]
-        api_base_url = "https://www.ebooks.com/api/subject/menu/"
-        user_agent = UserAgent()
-        dynamic_ua_headers = {
-            "User-Agent": user_agent.random, "accept-language": "en-US"}
-        timeout = 100
-
-        response = requests.get(
-            url=api_base_url, headers=dynamic_ua_headers, params=params, timeout=timeout)
-        subject_menu = response.json().get("subject_menus")
+        subject_menu = fetch_subject_menu(subject_id).get("subject_menus")
         return {entry["subject_name"]: entry["id"]
                 for entry in subject_menu[0]["subject_menu_entries"]}
 
     return fetch_topics(subject_id)
 
 
+def fetch_books_page(page_num: int, subject_id: int,
+                     rate_limiter: Optional[RateLimiter] = None) -> BooksPage:
+    """
+    Retrieve one page of books for a subject together with the result metadata.
+
+    Args:
+        page_num (int): The page number of the books data to retrieve.
+        subject_id (int): The ID of the subject.
+        rate_limiter (Optional[RateLimiter]): The limiter pacing the request.
+
+    Returns:
+        BooksPage: The parsed books and the total results of the subject.
+    """
+    (books, total_results), fetched_at = get_client().get_dated(
+        SUBJECT_SEARCH_ENDPOINT, search_params(page_num, subject_id), rate_limiter,
+        decode_book_records)
+    return BooksPage(subject_id=subject_id, page_num=page_num, books=books,
+                     total_results=total_results, page_size=len(books), fetched_at=fetched_at)
+
+
+def parse_books_page(payload: Dict[str, Any], page_num: int, subject_id: int,
+                     fetched_at: Optional[datetime] = None) -> BooksPage:
+    """
+    Build a `BooksPage` from a decoded subject search response, parsing its
+    books into `Book` records like `parse_books_batch()`.
+
+    Args:
+        payload (Dict[str, Any]): The decoded subject search response.
+        page_num (int): The page number the response belongs to.
+        subject_id (int): The ID of the subject.
+        fetched_at (Optional[datetime]): The time the response was fetched;
+            defaults to now.
+
+    Returns:
+        BooksPage: The parsed books and the result metadata.
+    """
+    books = _parse_book_records(payload.get("books") or [])
+    total_results = payload.get("total_results")
+    return BooksPage(
+        subject_id=subject_id,
+        page_num=page_num,
+        books=books,
+        total_results=int(total_results) if total_results is not None else 0,
+        page_size=len(books),
+        fetched_at=fetched_at if fetched_at is not None else datetime.now())
+
+
 def fetch_total_books_count(subject_id: int) -> int:
     """
     Retrieve the total number of books present for a given subject ID from the Ebooks API.
 
+    Prefer `fetch_books_page(1, subject_id)` when the first page's books are
+    needed as well, so the page is only downloaded once.
+
     Args:
         subject_id (int): The ID of the subject.
 
     Returns:
         int: The total number of books present.
     """
-    params = [
-        ("pageNumber", "1"),
-        ("CountryCode", "US"),
-        ("subjectID", str(subject_id))]
-    api_base_url = "https://www.ebooks.com/api/search/subject/"
-    user_agent = UserAgent()
-    dynamic_ua_headers = {
-        "User-Agent": user_agent.random, "accept-language": "en-US"}
-    timeout = 100
-
-    response = requests.get(
-        url=api_base_url, headers=dynamic_ua_headers, params=params, timeout=timeout)
-    total_books = response.json().get("total_results")
-    return int(total_books)
+    return fetch_books_page(1, subject_id).total_results
 
 
 def fetch_books_data(page_num: int, subject_id: int) -> Optional[List[Dict]]:
@@ -193,21 +879,612 @@ def fetch_books_data(page_num: int, subject_id: int) -> Optional[List[Dict]]:
         subject_id (int): The ID of the subject.
 
     Returns:
-        Optional[List[Dict]]: A list of dictionaries containing the books data.
-        Returns `None` if no books data is found.
+        Optional[List[Dict]]: A list of dictionaries containing the raw books data,
+        e.g. for `parse_books_details()`. Returns `None` if no books data is found.
     """
-    params = [
-        ("pageNumber", str(page_num)),
-        ("CountryCode", "US"),
-        ("subjectID", str(subject_id))]
-    api_base_url = "https://www.ebooks.com/api/search/subject/"
-    user_agent = UserAgent()
-    dynamic_ua_headers = {
-        "User-Agent": user_agent.random, "accept-language": "en-US"}
-    timeout = 100
+    payload = get_client().get_json(SUBJECT_SEARCH_ENDPOINT, search_params(page_num, subject_id))
+    books_data = payload.get("books") if isinstance(payload, dict) else None
+
+    return books_data or None
+
+
+def fetch_pages(
+    subject_id: int,
+    page_numbers: Iterable[int],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> Iterator[BooksPage]:
+    """
+    Fetch the given pages of a subject over a bounded thread pool.
+
+    At most `max_workers` requests are in flight at once and results are
+    yielded in the order of `page_numbers`, regardless of completion order.
+
+    Args:
+        subject_id (int): The ID of the subject.
+        page_numbers (Iterable[int]): The page numbers to fetch.
+        max_workers (int): The maximum number of concurrent requests.
+        rate_limiter (Optional[RateLimiter]): A limiter shared by the workers.
+
+    Yields:
+        BooksPage: The fetched pages, in the order of `page_numbers`.
+    """
+    limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+
+    def fetch(page_num: int) -> BooksPage:
+        return fetch_books_page(
+            page_num=page_num, subject_id=subject_id, rate_limiter=limiter)
+
+    yield from map_ordered(fetch, page_numbers, max_workers=max_workers)
+
+
+def map_ordered(func: Callable[[T], R], items: Iterable[T],
+                max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[R]:
+    """
+    Map a function over a bounded thread pool, yielding results in input order.
+
+    At most `max_workers` calls are in flight at once and `items` is only
+    consumed as results are taken, so it may be a lazy, unbounded iterable.
+
+    Args:
+        func (Callable[[T], R]): The function to call for every item.
+        items (Iterable[T]): The items to map.
+        max_workers (int): The maximum number of concurrent calls.
+
+    Yields:
+        R: The result of every item, in the order of `items`.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Deque[Future] = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def crawl_pages(
+    subject_id: int,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+) -> Iterator[BooksPage]:
+    """
+    Crawl every page of a subject concurrently, yielding pages in order.
+
+    The first page is fetched up front; its result metadata gives the number
+    of pages to fan out and its books are yielded rather than re-downloaded.
+
+    With a checkpoint, pages it already holds are yielded from it instead of
+    being requested, and every fetched page is saved to it before it is
+    yielded, so a crawl that failed midway resumes where it stopped. The first
+    page is always fetched afresh: checkpointed pages saved while the subject
+    held a different number of books are discarded rather than reused.
+
+    Args:
+        subject_id (int): The ID of the subject.
+        max_workers (int): The maximum number of concurrent requests.
+        requests_per_second (float): The request rate budget for the crawl.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages.
+
+    Yields:
+        BooksPage: The pages of the subject, in page order.
+    """
+    limiter = rate_limiter if rate_limiter is not None else RateLimiter(requests_per_second)
+    first_page = fetch_books_page(page_num=1, subject_id=subject_id, rate_limiter=limiter)
+    completed: Set[int] = set()
+    if checkpoint is not None:
+        checkpoint.discard_stale(subject_id, first_page.total_results)
+        completed = checkpoint.completed_pages(subject_id)
+        if first_page.books:
+            checkpoint.save_page(first_page)
+    if not first_page.books:
+        return
+    yield first_page
+
+    page_numbers = range(2, first_page.total_pages + 1)
+    fetched = fetch_pages(
+        subject_id, [page_num for page_num in page_numbers if page_num not in completed],
+        max_workers=max_workers, rate_limiter=limiter)
+    try:
+        for page_num in page_numbers:
+            books_page = (checkpoint.load_page(subject_id, page_num)
+                          if page_num in completed else None)
+            if books_page is None:
+                if page_num in completed:
+                    # Dropped from the checkpoint since the crawl started
+                    books_page = fetch_books_page(page_num, subject_id, limiter)
+                else:
+                    books_page = next(fetched)
+                if checkpoint is not None:
+                    checkpoint.save_page(books_page)
+            yield books_page
+    finally:
+        fetched.close()
+
+
+def crawl_new_pages(
+    subject_id: int,
+    seen_index: "SeenBooksIndex",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+    stop_after_known_pages: Optional[int] = None,
+) -> Iterator[BooksPage]:
+    """
+    Crawl a subject in page order, keeping only the books that are new or
+    changed since they were last recorded in `seen_index`.
+
+    Each yielded page holds just those books, which are marked in the index
+    once the consumer asks for the next page. A consumer that buffers its
+    output should crawl through `seen_index.deferred()` and commit it once the
+    output is complete, as `export_crawl()` does, so that an interrupted
+    refresh emits the books again next time rather than losing them.
+
+    Args:
+        subject_id (int): The ID of the subject.
+        seen_index (SeenBooksIndex): The index of the books already extracted.
+        max_workers (int): The maximum number of concurrent requests.
+        requests_per_second (float): The request rate budget for the crawl.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages;
+            see `crawl_pages()`.
+        stop_after_known_pages (Optional[int]): Stop paging after this many
+            consecutive pages without a new or changed book. Only safe if the
+            subject lists its newest books first; `None` crawls every page.
+
+    Yields:
+        BooksPage: The pages of the subject with their known books filtered out.
+    """
+    known_pages = 0
+    pages = crawl_pages(
+        subject_id, max_workers=max_workers, requests_per_second=requests_per_second,
+        rate_limiter=rate_limiter, checkpoint=checkpoint)
+    try:
+        for books_page in pages:
+            new_books = seen_index.changed_books(subject_id, books_page.books)
+            known_pages = 0 if new_books else known_pages + 1
+            yield replace(books_page, books=new_books, page_size=len(new_books))
+            seen_index.mark(subject_id, new_books)
+            if stop_after_known_pages is not None and known_pages >= stop_after_known_pages:
+                return
+    finally:
+        pages.close()
+
+
+def crawl_subjects(
+    subject_ids: Iterable[int],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+    stop: Optional[Callable[[BooksPage], bool]] = None,
+) -> Iterator[BooksPage]:
+    """
+    Crawl many subjects under one concurrency and rate budget.
+
+    Duplicate subject IDs are crawled once. The first page of every subject is
+    fetched up front to size the crawl, then the remaining pages are scheduled
+    round-robin across the subjects (page 2 of each, then page 3 of each, ...),
+    so small subjects finish early and no subject starves behind a large one.
+
+    Args:
+        subject_ids (Iterable[int]): The IDs of the subjects or topics to crawl.
+        max_workers (int): The maximum number of concurrent requests across all subjects.
+        requests_per_second (float): The request rate budget for the whole crawl.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages to
+            resume from and save to; see `crawl_pages()`.
+        stop (Optional[Callable[[BooksPage], bool]]): Called with every page
+            once the consumer asks for the next one; if it returns `True`, no
+            further page of that page's subject is requested or yielded.
+
+    Yields:
+        BooksPage: The pages of every subject, in schedule order.
+    """
+    limiter = rate_limiter if rate_limiter is not None else RateLimiter(requests_per_second)
+    subject_ids = list(dict.fromkeys(subject_ids))
+    # Filled once each subject's first page is fetched afresh, see crawl_pages()
+    completed: Dict[int, Set[int]] = {subject_id: set() for subject_id in subject_ids}
+    stopped: Set[int] = set()
+
+    def fetch(page_request: Tuple[int, int]) -> Tuple[BooksPage, bool]:
+        subject_id, page_num = page_request
+        if page_num in completed[subject_id]:
+            books_page = checkpoint.load_page(subject_id, page_num)
+            if books_page is not None:
+                return books_page, True
+        return fetch_books_page(
+            page_num=page_num, subject_id=subject_id, rate_limiter=limiter), False
+
+    def collect(page_requests: Iterable[Tuple[int, int]]) -> Iterator[BooksPage]:
+        for books_page, from_checkpoint in map_ordered(
+                fetch, page_requests, max_workers=max_workers):
+            if books_page.subject_id in stopped:
+                continue  # Requested ahead before its subject was stopped
+            if checkpoint is not None and books_page.books and not from_checkpoint:
+                checkpoint.save_page(books_page)
+            yield books_page
+            if stop is not None and stop(books_page):
+                stopped.add(books_page.subject_id)
+
+    first_pages = []
+    for books_page in collect((subject_id, 1) for subject_id in subject_ids):
+        if checkpoint is not None:
+            checkpoint.discard_stale(books_page.subject_id, books_page.total_results)
+            completed[books_page.subject_id] = checkpoint.completed_pages(books_page.subject_id)
+        if books_page.books:
+            first_pages.append(books_page)
+            yield books_page
+
+    def schedule() -> Iterator[Tuple[int, int]]:
+        remaining = [(books_page.subject_id, iter(range(2, books_page.total_pages + 1)))
+                     for books_page in first_pages]
+        while remaining:
+            next_round = []
+            for subject_id, page_numbers in remaining:
+                page_num = next(page_numbers, None) if subject_id not in stopped else None
+                if page_num is not None:
+                    yield subject_id, page_num
+                    next_round.append((subject_id, page_numbers))
+            remaining = next_round
+
+    yield from collect(schedule())
+
+
+def iter_subjects_book_batches(
+    subject_ids: Iterable[int],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    on_page: Optional[Callable[[BooksPage], None]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+    seen_index: Optional["SeenBooksIndex"] = None,
+    stop_after_known_pages: Optional[int] = None,
+) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Crawl many subjects into one stream of columns, see `crawl_subjects()`.
+
+    A book listed under several of the subjects is only emitted the first
+    time it is seen, so the merged result holds every book once.
+
+    Args:
+        subject_ids (Iterable[int]): The IDs of the subjects or topics to crawl.
+        max_workers (int): The maximum number of concurrent requests across all subjects.
+        requests_per_second (float): The request rate budget for the whole crawl.
+        on_page (Optional[Callable[[BooksPage], None]]): Called with every page
+            before its columns are yielded, e.g. to report progress.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages to
+            resume from and save to.
+        seen_index (Optional[SeenBooksIndex]): The index of the books already
+            extracted; if given, only new or changed books are emitted.
+        stop_after_known_pages (Optional[int]): With `seen_index`, stop paging a
+            subject after this many consecutive pages of it without a new or
+            changed book; see `crawl_new_pages()`.
+
+    Yields:
+        Dict[str, List[Any]]: The parsed, not yet emitted books of one page
+        keyed by `STORE_FIELDS`.
+    """
+    seen_book_ids: Set[Any] = set()
+    # The number of consecutive pages of each subject without a new or changed book
+    known_pages: Dict[int, int] = {}
+
+    def stop(books_page: BooksPage) -> bool:
+        return (stop_after_known_pages is not None
+                and known_pages.get(books_page.subject_id, 0) >= stop_after_known_pages)
+
+    for books_page in crawl_subjects(
+            subject_ids, max_workers=max_workers, requests_per_second=requests_per_second,
+            rate_limiter=rate_limiter, checkpoint=checkpoint, stop=stop):
+        if on_page is not None:
+            on_page(books_page)
+        books = books_page.books
+        if seen_index is not None:
+            books = seen_index.changed_books(books_page.subject_id, books)
+            known_pages[books_page.subject_id] = (
+                0 if books else known_pages.get(books_page.subject_id, 0) + 1)
+        new_books = []
+        for book in books:
+            if book.book_id not in seen_book_ids:
+                seen_book_ids.add(book.book_id)
+                new_books.append(book)
+        columns = book_records_to_columns(new_books)
+        columns["scrape_timestamp"] = [books_page.fetched_at] * len(new_books)
+        yield columns
+        if seen_index is not None:
+            seen_index.mark(books_page.subject_id, books)
+
+
+def _crawl(
+    subject_id: int,
+    max_workers: int,
+    requests_per_second: float,
+    rate_limiter: Optional[RateLimiter],
+    checkpoint: Optional["CrawlCheckpoint"],
+    seen_index: Optional["SeenBooksIndex"],
+    stop_after_known_pages: Optional[int],
+) -> Iterator[BooksPage]:
+    if seen_index is None:
+        return crawl_pages(
+            subject_id, max_workers=max_workers, requests_per_second=requests_per_second,
+            rate_limiter=rate_limiter, checkpoint=checkpoint)
+    return crawl_new_pages(
+        subject_id, seen_index, max_workers=max_workers,
+        requests_per_second=requests_per_second, rate_limiter=rate_limiter,
+        checkpoint=checkpoint, stop_after_known_pages=stop_after_known_pages)
+
+
+def iter_books(
+    subject_id: int,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    on_page: Optional[Callable[[BooksPage], None]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+    seen_index: Optional["SeenBooksIndex"] = None,
+    stop_after_known_pages: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily crawl a subject, yielding parsed book records in page order.
+
+    Pages are only requested as the consumer catches up: at most `max_workers`
+    pages are fetched ahead of the record being yielded, so memory stays
+    bounded no matter how large the subject is.
+
+    Args:
+        subject_id (int): The ID of the subject.
+        max_workers (int): The maximum number of concurrent requests.
+        requests_per_second (float): The request rate budget for the crawl.
+        on_page (Optional[Callable[[BooksPage], None]]): Called with every page
+            before its records are yielded, e.g. to report progress.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages
+            to resume from and save to; see `crawl_pages()`.
+        seen_index (Optional[SeenBooksIndex]): The index of the books already
+            extracted; if given, only new or changed books are emitted, see
+            `crawl_new_pages()`.
+        stop_after_known_pages (Optional[int]): With `seen_index`, stop paging
+            after this many consecutive pages without a new or changed book.
+
+    Yields:
+        Dict[str, Any]: The parsed details of one book, with `scrape_timestamp`
+        set to the fetch time of its page (callers may override it per record).
+    """
+    for books_page in _crawl(subject_id, max_workers, requests_per_second, rate_limiter,
+                             checkpoint, seen_index, stop_after_known_pages):
+        if on_page is not None:
+            on_page(books_page)
+        for book in books_page.books:
+            details = book_record_to_dict(book)
+            details["scrape_timestamp"] = books_page.fetched_at
+            yield details
+
+
+def iter_book_batches(
+    subject_id: int,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    on_page: Optional[Callable[[BooksPage], None]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional["CrawlCheckpoint"] = None,
+    seen_index: Optional["SeenBooksIndex"] = None,
+    stop_after_known_pages: Optional[int] = None,
+) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Lazily crawl a subject, yielding the books of each page as columns.
+
+    The columnar counterpart of `iter_books()`; see `book_records_to_columns()`.
+
+    Args:
+        subject_id (int): The ID of the subject.
+        max_workers (int): The maximum number of concurrent requests.
+        requests_per_second (float): The request rate budget for the crawl.
+        on_page (Optional[Callable[[BooksPage], None]]): Called with every page
+            before its columns are yielded, e.g. to report progress.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+        checkpoint (Optional[CrawlCheckpoint]): The store of completed pages
+            to resume from and save to; see `crawl_pages()`.
+        seen_index (Optional[SeenBooksIndex]): The index of the books already
+            extracted; if given, only new or changed books are emitted, see
+            `crawl_new_pages()`.
+        stop_after_known_pages (Optional[int]): With `seen_index`, stop paging
+            after this many consecutive pages without a new or changed book.
+
+    Yields:
+        Dict[str, List[Any]]: The parsed books of one page keyed by `STORE_FIELDS`;
+        every `scrape_timestamp` references the page's `fetched_at` datetime.
+    """
+    for books_page in _crawl(subject_id, max_workers, requests_per_second, rate_limiter,
+                             checkpoint, seen_index, stop_after_known_pages):
+        if on_page is not None:
+            on_page(books_page)
+        columns = book_records_to_columns(books_page.books)
+        columns["scrape_timestamp"] = [books_page.fetched_at] * books_page.page_size
+        yield columns
+
+
+def decode_book_records(content: Union[bytes, str]) -> Tuple[List[Any], int]:
+    """
+    Decode a raw subject search response straight into book records.
+
+    With the msgspec JSON backend, the body is decoded and validated in one
+    pass into compact typed records following `BOOK_SOURCE_KEYS`, with the
+    authors joined and the URL made absolute as by `parse_book()`; no raw
+    dict is built for any book. A page whose values do not have the types of
+    `Book` (e.g. numeric IDs) is decoded again untyped instead, so it yields
+    the same values whichever backend is installed. With the other backends,
+    the books are decoded to dicts and parsed like `parse_books_batch()`.
+
+    Args:
+        content (Union[bytes, str]): The raw subject search response.
+
+    Returns:
+        Tuple[List[Any], int]: The books, as records with the attributes of
+        `Book`, and the total number of books of the subject.
+
+    Raises:
+        ValueError: If the body is malformed or not a JSON object.
+    """
+    decoder = get_json_decoder()
+    loads_page = decoder.typed_loads(_SearchPageRecord) if msgspec is not None else None
+    if loads_page is not None:
+        try:
+            page = loads_page(content)
+        except SchemaMismatchError:
+            pass  # Loosely typed values: parse the page untyped below
+        else:
+            total_results = page.total_results
+            return page.books or [], int(total_results) if total_results is not None else 0
+    payload = decoder.loads(content)
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected a JSON object, got {type(payload).__name__}")
+    books_page = parse_books_page(payload, 0, 0)
+    return books_page.books, books_page.total_results
+
+
+def book_records_to_columns(records: List[Any]) -> Dict[str, List[Any]]:
+    """
+    Turn book records into columns, one list per `Book` attribute.
+
+    Args:
+        records (List[Any]): Records with the attributes of `Book`, e.g. from
+            `decode_book_records()`.
+
+    Returns:
+        Dict[str, List[Any]]: The values keyed by `BOOK_FIELDS`.
+    """
+    return {name: list(map(attrgetter(name), records)) for name in BOOK_FIELDS}
+
+
+def book_record_to_dict(record: Any) -> Dict[str, Any]:
+    """
+    Turn a book record into a dictionary, like `parse_books_details()` does
+    for the raw data of a book.
+
+    Args:
+        record (Any): A record with the attributes of `Book`, e.g. from `BooksPage.books`.
+
+    Returns:
+        Dict[str, Any]: The values keyed by `BOOK_FIELDS`.
+    """
+    return {name: getattr(record, name) for name in BOOK_FIELDS}
+
+
+def decode_books_page(content: bytes, page_num: int, subject_id: int,
+                      fetched_at: datetime) -> Tuple[BooksPage, Dict[str, List[Any]]]:
+    """
+    Decode a raw subject search response straight into columns.
+
+    A module-level function, so it can run in a worker process: only the raw
+    bytes are sent to the worker and only the columns come back. The books
+    are decoded with `decode_book_records()`.
+
+    Args:
+        content (bytes): The raw subject search response.
+        page_num (int): The page number the response belongs to.
+        subject_id (int): The ID of the subject.
+        fetched_at (datetime): The time the page was fetched.
+
+    Returns:
+        Tuple[BooksPage, Dict[str, List[Any]]]: The page metadata (with its
+        `books` left empty) and the parsed books keyed by `STORE_FIELDS`.
+    """
+    records, total_results = decode_book_records(content)
+    columns = book_records_to_columns(records)
+    columns["scrape_timestamp"] = [fetched_at] * len(records)
+    books_page = BooksPage(subject_id=subject_id, page_num=page_num, books=[],
+                           total_results=total_results, page_size=len(records),
+                           fetched_at=fetched_at)
+    return books_page, columns
+
+
+def iter_book_batches_parallel(
+    subject_id: int,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    processes: Optional[int] = None,
+    on_page: Optional[Callable[[BooksPage], None]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Crawl a subject like `iter_book_batches()`, but decode and parse the pages
+    in a process pool, so large backfills use every core instead of one.
+
+    Threads fetch the raw pages while worker processes decode them with
+    `decode_books_page()`; the columns are yielded in page order. A page
+    whose body fails to decode is dropped from the response cache and
+    downloaded again, retried like `get_json()`. Since the raw books never
+    come back from the workers, this mode does not support checkpoints or a
+    seen-books index.
+
+    Args:
+        subject_id (int): The ID of the subject.
+        max_workers (int): The maximum number of concurrent requests.
+        requests_per_second (float): The request rate budget for the crawl.
+        processes (Optional[int]): The number of worker processes (default: one per CPU).
+        on_page (Optional[Callable[[BooksPage], None]]): Called with the metadata
+            of every page (its `books` left empty) before its columns are yielded.
+        rate_limiter (Optional[RateLimiter]): A limiter shared with other crawls,
+            used instead of a new one built from `requests_per_second`.
+
+    Yields:
+        Dict[str, List[Any]]: The parsed books of one page keyed by `STORE_FIELDS`.
+    """
+    limiter = rate_limiter if rate_limiter is not None else RateLimiter(requests_per_second)
+    client = get_client()
+
+    def fetch(page_num: int) -> Tuple[bytes, int, int, datetime]:
+        content, fetched_at = client.get_dated(
+            SUBJECT_SEARCH_ENDPOINT, search_params(page_num, subject_id), limiter, bytes)
+        return content, page_num, subject_id, fetched_at
+
+    def decoded(page_num: int, future: Future) -> Tuple[BooksPage, Dict[str, List[Any]]]:
+        try:
+            return future.result()
+        except ValueError:
+            # A truncated or malformed body: download it afresh, decoding it here
+            # as part of each attempt so that the retry policy covers it
+            params = search_params(page_num, subject_id)
+            if client.response_cache is not None:
+                client.response_cache.discard(response_cache_key(SUBJECT_SEARCH_ENDPOINT, params))
+            return client.get_json(
+                SUBJECT_SEARCH_ENDPOINT, params, limiter,
+                lambda content: decode_books_page(content, page_num, subject_id, datetime.now()))
+
+    num_processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=num_processes) as pool:
+        first_page, first_columns = decoded(1, pool.submit(decode_books_page, *fetch(1)))
+        if first_page.page_size == 0:
+            return
+        if on_page is not None:
+            on_page(first_page)
+        yield first_columns
+
+        pending: Deque[Tuple[int, Future]] = deque()
 
-    response = requests.get(
-        url=api_base_url, headers=dynamic_ua_headers, params=params, timeout=timeout)
-    books_data = response.json().get("books")
+        def take() -> Dict[str, List[Any]]:
+            books_page, columns = decoded(*pending.popleft())
+            if on_page is not None:
+                on_page(books_page)
+            return columns
 
-    return books_data
+        # Keep every worker busy while bounding the decoded pages held in memory
+        for fetched in map_ordered(
+                fetch, range(2, first_page.total_pages + 1), max_workers=max_workers):
+            pending.append((fetched[1], pool.submit(decode_books_page, *fetched)))
+            while pending and (len(pending) >= 2 * num_processes or pending[0][1].done()):
+                yield take()
+        while pending:
+            yield take()
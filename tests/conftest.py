@@ -0,0 +1,45 @@
+"""Shared fixtures: an in-memory catalog standing in for the subject search API."""
+
+
+import math
+from typing import Dict, List
+
+import pytest
+
+import scraper_util as su
+
+PAGE_SIZE = 10
+
+
+class FakeCatalog:
+    """Serve `fetch_books_page()` from in-memory books, counting the requests."""
+
+    def __init__(self) -> None:
+        self.subjects: Dict[int, List[dict]] = {}
+        self.requests: List[tuple] = []
+        self.fail_pages: set = set()
+
+    def add_subject(self, subject_id: int, num_books: int, prefix: str = "") -> None:
+        self.subjects[subject_id] = [
+            {"id": f"{prefix or subject_id}-{book_num}", "title": f"Book {book_num}",
+             "authors": [{"name": "Author"}], "book_url": f"/en/book/{book_num}/"}
+            for book_num in range(num_books)]
+
+    def total_pages(self, subject_id: int) -> int:
+        return math.ceil(len(self.subjects[subject_id]) / PAGE_SIZE)
+
+    def fetch_books_page(self, page_num, subject_id, rate_limiter=None):
+        self.requests.append((subject_id, page_num))
+        if (subject_id, page_num) in self.fail_pages:
+            raise RuntimeError(f"page {page_num} of subject {subject_id} failed")
+        books = self.subjects[subject_id]
+        page_books = books[(page_num - 1) * PAGE_SIZE:page_num * PAGE_SIZE]
+        return su.parse_books_page(
+            {"books": page_books, "total_results": len(books)}, page_num, subject_id)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    fake = FakeCatalog()
+    monkeypatch.setattr(su, "fetch_books_page", fake.fetch_books_page)
+    return fake
@@ -0,0 +1,120 @@
+"""Tests of the crawl state kept by `CrawlCheckpoint` and `SeenBooksIndex`."""
+
+
+import time
+
+import pytest
+
+import export_util as eu
+import scraper_util as su
+from checkpoint_util import CrawlCheckpoint, SeenBooksIndex
+
+
+def crawl_ids(subject_id, checkpoint):
+    return [book.book_id for books_page in su.crawl_pages(subject_id, checkpoint=checkpoint)
+            for book in books_page.books]
+
+
+def test_crawl_resumes_from_checkpointed_pages(catalog):
+    catalog.add_subject(1, 50)
+    checkpoint = CrawlCheckpoint(":memory:")
+    for page_num in (1, 2, 3):
+        checkpoint.save_page(catalog.fetch_books_page(page_num, 1))
+    catalog.requests.clear()
+
+    assert crawl_ids(1, checkpoint) == [book["id"] for book in catalog.subjects[1]]
+    # Page 1 is always fetched afresh to validate the checkpoint
+    assert sorted(catalog.requests) == [(1, 1), (1, 4), (1, 5)]
+
+
+def test_checkpoint_of_a_subject_that_changed_size_is_discarded(catalog):
+    catalog.add_subject(1, 50, prefix="old")
+    checkpoint = CrawlCheckpoint(":memory:")
+    for page_num in (1, 2, 3):
+        checkpoint.save_page(catalog.fetch_books_page(page_num, 1))
+    catalog.add_subject(1, 60, prefix="new")
+    catalog.requests.clear()
+
+    assert crawl_ids(1, checkpoint) == [book["id"] for book in catalog.subjects[1]]
+    assert len(catalog.requests) == 6
+
+
+def test_expired_checkpointed_pages_are_ignored(catalog):
+    catalog.add_subject(1, 30)
+    checkpoint = CrawlCheckpoint(":memory:", max_age=0.05)
+    checkpoint.save_page(catalog.fetch_books_page(2, 1))
+    assert checkpoint.completed_pages(1) == {2}
+    time.sleep(0.06)
+    assert checkpoint.completed_pages(1) == set()
+    assert checkpoint.load_page(1, 2) is None
+
+
+def test_pages_dropped_mid_crawl_are_fetched_instead(catalog):
+    catalog.add_subject(1, 30)
+    checkpoint = CrawlCheckpoint(":memory:")
+    for page_num in (1, 2, 3):
+        checkpoint.save_page(catalog.fetch_books_page(page_num, 1))
+
+    pages = su.crawl_pages(1, checkpoint=checkpoint)
+    assert next(pages).page_num == 1
+    checkpoint.clear(1)
+    assert [books_page.page_num for books_page in pages] == [2, 3]
+
+
+def test_multi_subject_crawl_validates_each_checkpoint(catalog):
+    catalog.add_subject(1, 20, prefix="old")
+    catalog.add_subject(2, 20)
+    checkpoint = CrawlCheckpoint(":memory:")
+    for subject_id in (1, 2):
+        checkpoint.save_page(catalog.fetch_books_page(2, subject_id))
+    catalog.add_subject(1, 25, prefix="new")
+    catalog.requests.clear()
+
+    pages = list(su.crawl_subjects([1, 2], checkpoint=checkpoint))
+    assert [book.book_id for books_page in pages if books_page.subject_id == 1
+            for book in books_page.books] == [book["id"] for book in catalog.subjects[1]]
+    assert sorted(catalog.requests) == [(1, 1), (1, 2), (1, 3), (2, 1)]
+
+
+def test_failed_export_marks_no_books_as_seen(catalog, tmp_path):
+    catalog.add_subject(1, 30)
+    catalog.fail_pages.add((1, 3))
+    seen_index = SeenBooksIndex(":memory:")
+    with pytest.raises(RuntimeError):
+        eu.export_crawl([1], str(tmp_path / "books.csv"), seen_index=seen_index)
+    assert seen_index.count(1) == 0
+
+    catalog.fail_pages.clear()
+    assert eu.export_crawl([1], str(tmp_path / "books.csv"), seen_index=seen_index) == 30
+    assert seen_index.count(1) == 30
+    assert eu.export_crawl([1], str(tmp_path / "books.csv"), seen_index=seen_index) == 0
+
+
+def test_deferred_marks_count_as_seen_before_commit():
+    seen_index = SeenBooksIndex(":memory:")
+    books = [su.parse_book({"id": "a", "title": "A"}), su.parse_book({"id": "b", "title": "B"})]
+    deferred = seen_index.deferred()
+    deferred.mark(1, books[:1])
+    assert deferred.changed_books(1, books) == books[1:]
+    assert seen_index.changed_books(1, books) == books
+    deferred.commit()
+    assert seen_index.changed_books(1, books) == books[1:]
+
+
+@pytest.mark.parametrize("subject_ids", [[1], [1, 2]])
+def test_export_stops_paging_after_known_pages(catalog, tmp_path, subject_ids):
+    for subject_id in subject_ids:
+        catalog.add_subject(subject_id, 100)
+    seen_index = SeenBooksIndex(":memory:")
+    path = str(tmp_path / "books.csv")
+    eu.export_crawl(subject_ids, path, seen_index=seen_index)
+
+    catalog.subjects[1].insert(0, {"id": "newest", "title": "Newest"})
+    catalog.requests.clear()
+    rows_written = eu.export_crawl(subject_ids, path, max_workers=1, seen_index=seen_index,
+                                   stop_after_known_pages=2)
+    assert rows_written == 1
+    # Page 1 of subject 1 holds the new book; every other page is known
+    assert sorted(catalog.requests) == sorted(
+        [(1, 1), (1, 2), (1, 3)] + [(subject_id, page_num) for subject_id in subject_ids[1:]
+                                    for page_num in (1, 2)])
@@ -0,0 +1,63 @@
+"""Tests of the command-line runner `cli`."""
+
+
+import pytest
+
+import cli
+import export_util as eu
+import scraper_util as su
+
+
+@pytest.fixture
+def menu(monkeypatch):
+    subject_menu = su.SubjectMenu(
+        categories={"Fiction": {"Romance": 1, "Crime": 2}, "Non-Fiction": {"Computers": 3}},
+        subject_ids={"Romance": 1, "Crime": 2, "Computers": 3},
+        topics={1: {}, 2: {"Noir": 20}, 3: {"Programming": 30, "Networks": 31}})
+    monkeypatch.setattr(su, "load_subject_menu", lambda: subject_menu)
+    return subject_menu
+
+
+@pytest.fixture
+def exports(monkeypatch):
+    calls = []
+
+    def export_crawl(subject_ids, path, fmt, **kwargs):
+        calls.append((subject_ids, path, fmt))
+        return 0
+
+    monkeypatch.setattr(eu, "export_crawl", export_crawl)
+    return calls
+
+
+def test_selections_resolve_to_ids_in_request_order(menu, exports):
+    assert cli.main(["--id", "99", "--subject", "Romance", "--topic", "Computers/Networks",
+                     "--category", "Fiction", "-o", "books.csv", "-q"]) == 0
+    assert exports == [([99, 1, 31, 20], "books.csv", "csv")]
+
+
+@pytest.mark.parametrize("selection", [
+    ["--subject", "Horror"], ["--topic", "Horror/Noir"], ["--topic", "Crime/Heists"],
+    ["--category", "Poetry"]])
+def test_unknown_names_are_rejected(menu, exports, selection):
+    with pytest.raises(SystemExit):
+        cli.main(selection + ["-o", "books.csv"])
+    assert exports == []
+
+
+@pytest.mark.parametrize("output, options, fmt", [
+    ("books.parquet", [], "parquet"),
+    ("books.ARROW", [], "arrow"),
+    ("books.txt", [], "csv"),
+    ("books", [], "csv"),
+    ("books.parquet", ["-f", "csv"], "csv"),
+])
+def test_format_follows_the_output_extension(exports, output, options, fmt):
+    assert cli.main(["--id", "1", "-o", output, "-q"] + options) == 0
+    assert exports == [([1], output, fmt)]
+
+
+def test_stop_after_known_pages_requires_new_only(exports):
+    with pytest.raises(SystemExit):
+        cli.main(["--id", "1", "-o", "books.csv", "--stop-after-known-pages", "2"])
+    assert exports == []
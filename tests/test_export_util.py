@@ -0,0 +1,81 @@
+"""Tests of the export sinks of `export_util`."""
+
+
+import csv
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import export_util as eu
+import scraper_util as su
+
+
+def test_parquet_row_groups_hold_buffer_size_rows(tmp_path):
+    path = str(tmp_path / "books.parquet")
+    records = ({"book_id": str(book_num), "book_title": f"Book {book_num}"}
+               for book_num in range(1200))
+    assert eu.write_records(records, path, "parquet", buffer_size=500) == 1200
+
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(index).num_rows
+            for index in range(metadata.num_row_groups)] == [500, 500, 200]
+    assert pq.read_table(path).schema == eu.book_arrow_schema()
+
+
+def test_arrow_dictionary_deltas_read_back_across_batches(catalog, tmp_path):
+    catalog.add_subject(1, 30)
+    for book_num, book in enumerate(catalog.subjects[1]):
+        # New publishers keep appearing on later pages
+        book["publisher"] = f"Publisher {book_num // 5}"
+    path = str(tmp_path / "books.arrow")
+    with eu.open_sink(path, "arrow", buffer_size=10, dictionary_encoded=True) as sink:
+        for books_columns in su.iter_book_batches(1, max_workers=1):
+            sink.write_batch(books_columns)
+    # Later batches extend the publisher dictionary instead of replacing it
+    stats = sink._writer.stats
+    assert (stats.num_dictionary_deltas, stats.num_replaced_dictionaries) == (2, 0)
+
+    with pa.ipc.open_file(path) as reader:
+        assert reader.num_record_batches == 3
+        table = reader.read_all()
+    assert pa.types.is_dictionary(table.schema.field("publisher").type)
+    assert table.column("publisher").to_pylist() == [
+        f"Publisher {book_num // 5}" for book_num in range(30)]
+    assert table.column("prime_authors").to_pylist() == ["Author"] * 30
+
+
+def test_csv_timestamps_are_formatted(tmp_path):
+    path = str(tmp_path / "books.csv")
+    fetched_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    with eu.CsvSink(path, fieldnames=("book_id", "scrape_timestamp")) as sink:
+        sink.write({"book_id": "1", "scrape_timestamp": fetched_at})
+        sink.write_batch({"book_id": ["2", "3"], "scrape_timestamp": [fetched_at, None]})
+
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert [row["scrape_timestamp"] for row in rows] == [
+        "2024-05-01 12:30:15", "2024-05-01 12:30:15", ""]
+
+
+def test_page_batches_are_gathered_into_full_row_groups(catalog, tmp_path):
+    catalog.add_subject(1, 1234)
+    path = str(tmp_path / "books.parquet")
+    assert eu.export_crawl([1], path, "parquet") == 1234
+
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(index).num_rows
+            for index in range(metadata.num_row_groups)] == [500, 500, 234]
+    assert pq.read_table(path).column("book_id").to_pylist() == [
+        f"1-{book_num}" for book_num in range(1234)]
+
+
+def test_records_and_batches_keep_their_order(tmp_path):
+    path = str(tmp_path / "books.csv")
+    with eu.CsvSink(path, fieldnames=("book_id",), buffer_size=4) as sink:
+        sink.write_batch({"book_id": ["1", "2", "3"]})
+        sink.write({"book_id": "4"})
+        sink.write_batch({"book_id": ["5", "6", "7", "8", "9"]})
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        assert [row["book_id"] for row in csv.DictReader(csv_file)] == [
+            str(book_num) for book_num in range(1, 10)]
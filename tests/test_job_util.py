@@ -0,0 +1,70 @@
+"""Tests of the background crawl jobs of `JobManager`."""
+
+
+import os
+import time
+
+import pytest
+
+from job_util import JobManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    job_manager = JobManager(str(tmp_path), num_workers=2)
+    yield job_manager
+    job_manager.shutdown()
+
+
+def wait_for(manager, job):
+    deadline = time.monotonic() + 10
+    while not manager.get(job.job_id).finished:
+        assert time.monotonic() < deadline, "the job did not finish"
+        time.sleep(0.01)
+    return manager.get(job.job_id)
+
+
+def test_full_runs_ignore_the_seen_books_of_new_books_only_runs(catalog, manager):
+    catalog.add_subject(1, 25)
+    new_only = wait_for(manager, manager.submit("owner", [1], new_books_only=True))
+    assert (new_only.status, new_only.rows_written) == ("succeeded", 25)
+
+    full = wait_for(manager, manager.submit("owner", [1]))
+    assert (full.status, full.rows_written) == ("succeeded", 25)
+    again = wait_for(manager, manager.submit("owner", [1], new_books_only=True))
+    assert (again.status, again.rows_written) == ("succeeded", 0)
+
+
+def test_failed_jobs_keep_their_checkpoints_and_resume_on_retry(catalog, manager):
+    catalog.add_subject(1, 25)
+    catalog.fail_pages.add((1, 3))
+    failed = wait_for(manager, manager.submit("owner", [1]))
+    assert failed.status == "failed"
+    checkpoints_dir = os.path.join(manager.state_dir, "checkpoints")
+    assert os.listdir(checkpoints_dir) == [f"{failed.job_id}.sqlite"]
+
+    catalog.fail_pages.clear()
+    catalog.requests.clear()
+    assert manager.retry(failed.job_id).status == "queued"
+    retried = wait_for(manager, failed)
+    assert (retried.status, retried.rows_written) == ("succeeded", 25)
+    # Only the first page, fetched afresh to check the total, and the failed page
+    assert sorted(page_num for _, page_num in catalog.requests) == [1, 3]
+    assert os.listdir(checkpoints_dir) == []
+
+
+def test_dismissed_failed_jobs_delete_their_checkpoints(catalog, manager):
+    catalog.add_subject(1, 25)
+    catalog.fail_pages.add((1, 3))
+    failed = wait_for(manager, manager.submit("owner", [1]))
+    manager.remove(failed.job_id)
+    assert manager.retry(failed.job_id) is None
+    assert os.listdir(os.path.join(manager.state_dir, "checkpoints")) == []
+
+
+def test_owners_do_not_share_their_seen_books(catalog, manager):
+    catalog.add_subject(1, 25)
+    first = wait_for(manager, manager.submit("owner", [1], new_books_only=True))
+    other = wait_for(manager, manager.submit("other owner", [1], new_books_only=True))
+    again = wait_for(manager, manager.submit("owner", [1], new_books_only=True))
+    assert [job.rows_written for job in (first, other, again)] == [25, 25, 0]
@@ -0,0 +1,160 @@
+"""Tests of the rate limiting and retry building blocks of `network_util`."""
+
+
+import asyncio
+import time
+
+import pytest
+
+from network_util import (BackoffPolicy, CircuitBreaker, CircuitOpenError, RateLimiter,
+                          RetryableStatusError, RetryPolicy)
+
+FAST_BACKOFF = BackoffPolicy(max_attempts=6, initial_delay=0.001, max_delay=0.001)
+
+
+def test_rate_limiter_spaces_requests_at_its_rate():
+    limiter = RateLimiter(2.0)
+    waits = [limiter.reserve("host") for _ in range(3)]
+    assert waits == pytest.approx([0.0, 0.5, 1.0], abs=0.01)
+
+
+def test_rate_limiter_spaces_waiters_once_a_retry_after_block_lifts():
+    limiter = RateLimiter(4.0)
+    limiter.reserve("host")
+    limiter.record("host", 429, 0.1, retry_after=2.0)
+    assert limiter.rate("host") == 2.0
+
+    waits = [limiter.reserve("host") for _ in range(4)]
+    assert waits == pytest.approx([2.0, 2.5, 3.0, 3.5], abs=0.01)
+
+
+def test_rate_limiter_keeps_one_bucket_per_host():
+    limiter = RateLimiter(2.0)
+    limiter.reserve("host")
+    limiter.record("host", 429, 0.1, retry_after=5.0)
+    assert limiter.reserve("host") == pytest.approx(5.0, abs=0.01)
+    assert limiter.reserve("other") == 0.0
+
+
+def failing(status_code, failures):
+    """Return a request raising `status_code` `failures` times, then returning "ok"."""
+    calls = []
+
+    def request():
+        calls.append(None)
+        if len(calls) <= failures:
+            raise RetryableStatusError(status_code, "https://host/")
+        return "ok"
+
+    return request, calls
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_circuit_breaker_opens_after_threshold_then_half_opens():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True
+    # Only one trial request at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_circuit_breaker_trial_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_trial_ending_in_an_unretried_error_frees_the_trial_slot():
+    breaker = CircuitBreaker(failure_threshold=7, reset_timeout=0.05)
+    policy = RetryPolicy({RetryableStatusError: FAST_BACKOFF}, circuit_breaker=breaker)
+    open_breaker(breaker)
+    time.sleep(0.06)
+
+    def not_found():
+        raise LookupError("404")
+
+    with pytest.raises(LookupError):
+        policy.call(not_found)
+    assert breaker.state == "half_open"
+    assert policy.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_rate_limit_push_back_does_not_count_against_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=7)
+    policy = RetryPolicy({RetryableStatusError: FAST_BACKOFF}, circuit_breaker=breaker)
+    for _ in range(3):
+        request, _ = failing(429, failures=5)
+        assert policy.call(request) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_one_failing_request_exhausts_its_budget_without_opening_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=7)
+    policy = RetryPolicy({RetryableStatusError: FAST_BACKOFF}, circuit_breaker=breaker)
+    request, calls = failing(503, failures=10)
+    with pytest.raises(RetryableStatusError):
+        policy.call(request)
+    assert len(calls) == FAST_BACKOFF.max_attempts
+    assert breaker.state == "closed"
+
+
+def test_requests_wait_for_an_open_breaker_instead_of_failing():
+    breaker = CircuitBreaker(failure_threshold=7, reset_timeout=0.1)
+    policy = RetryPolicy({RetryableStatusError: FAST_BACKOFF}, circuit_breaker=breaker)
+    open_breaker(breaker)
+    started = time.monotonic()
+    assert policy.call(lambda: "ok") == "ok"
+    assert time.monotonic() - started >= 0.09
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_fails_once_the_time_budget_is_spent():
+    breaker = CircuitBreaker(failure_threshold=7, reset_timeout=60.0)
+    policy = RetryPolicy({RetryableStatusError: FAST_BACKOFF}, max_elapsed=0.5,
+                         circuit_breaker=breaker)
+    open_breaker(breaker)
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda: "ok")
+
+
+def test_breaker_threshold_must_exceed_the_attempt_budgets():
+    with pytest.raises(ValueError):
+        RetryPolicy({RetryableStatusError: FAST_BACKOFF},
+                    circuit_breaker=CircuitBreaker(failure_threshold=6))
+
+
+def test_async_requests_wait_for_an_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=7, reset_timeout=0.1)
+    policy = RetryPolicy({RetryableStatusError: FAST_BACKOFF}, circuit_breaker=breaker)
+    open_breaker(breaker)
+
+    async def request():
+        return "ok"
+
+    assert asyncio.run(policy.acall(request)) == "ok"
+    assert breaker.state == "closed"
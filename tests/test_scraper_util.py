@@ -0,0 +1,224 @@
+"""Tests of the Ebooks API clients of `scraper_util` and `async_scraper_util`."""
+
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import async_scraper_util as asu
+import scraper_util as su
+from json_util import JsonDecoder, available_backends, set_json_decoder
+from network_util import BackoffPolicy, ResponseCache, RetryPolicy, response_cache_key
+
+PARAMS = su.search_params(1, 7)
+
+
+def cached_search_response(stored_ago):
+    cache = ResponseCache(":memory:")
+    key = response_cache_key(su.SUBJECT_SEARCH_ENDPOINT, PARAMS)
+    cache.put(key, json.dumps({"books": [], "total_results": 0}))
+    stored_at = datetime.now() - stored_ago
+    cache._connection.execute(
+        "UPDATE responses SET stored_at = ? WHERE key = ?", (stored_at.timestamp(), key))
+    return cache, stored_at
+
+
+def no_requests(*args, **kwargs):
+    raise AssertionError("a fresh cache entry must not be requested")
+
+
+def test_fresh_cached_body_is_dated_by_its_stored_time(monkeypatch):
+    cache, stored_at = cached_search_response(timedelta(minutes=30))
+    client = su.EbooksClient(response_cache=cache)
+    monkeypatch.setattr(client, "send", no_requests)
+
+    payload, fetched_at = client.get_dated(su.SUBJECT_SEARCH_ENDPOINT, PARAMS)
+    assert payload == {"books": [], "total_results": 0}
+    assert fetched_at == stored_at
+
+
+def test_async_fresh_cached_body_is_dated_by_its_stored_time(monkeypatch):
+    cache, stored_at = cached_search_response(timedelta(minutes=30))
+
+    async def fetch():
+        async with asu.AsyncEbooksClient(response_cache=cache) as client:
+            monkeypatch.setattr(client, "send", no_requests)
+            return await asu.fetch_books_page(client, 1, 7)
+
+    assert asyncio.run(fetch()).fetched_at == stored_at
+
+
+def search_response(page_num, num_pages=3, truncated=False):
+    books = [{"id": f"{page_num}-{book_num}", "title": f"Book {book_num}",
+              "book_url": f"/en/book/{book_num}/"} for book_num in range(2)]
+    body = json.dumps({"books": books, "total_results": 2 * num_pages}).encode()
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body[:len(body) // 2] if truncated else body
+    return response
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = su.EbooksClient(
+        retry_policy=RetryPolicy({ValueError: BackoffPolicy(max_attempts=3, initial_delay=0.001)}),
+        response_cache=ResponseCache(":memory:"))
+    previous = su.set_client(client)
+    yield client
+    su.set_client(previous)
+
+
+def test_parallel_crawl_downloads_again_a_page_failing_to_decode(fake_client, monkeypatch):
+    requested = []
+
+    def send(endpoint, params, rate_limiter=None, headers=None):
+        page_num = int(dict(params)["pageNumber"])
+        requested.append(page_num)
+        # The first download of page 2 is cut short
+        return search_response(page_num, truncated=requested.count(2) == 1 and page_num == 2)
+
+    monkeypatch.setattr(fake_client, "send", send)
+    batches = list(su.iter_book_batches_parallel(7, max_workers=2, processes=1))
+    assert [book_id for columns in batches for book_id in columns["book_id"]] == [
+        f"{page_num}-{book_num}" for page_num in (1, 2, 3) for book_num in range(2)]
+    assert sorted(requested) == [1, 2, 2, 3]
+
+
+RAW_BOOKS = [
+    {"id": "1", "title": "A", "publication_year": 2020, "num_authors": 2,
+     "authors": [{"name": "X", "bio": "..."}, {"name": "Y"}],
+     "book_url": "/en/book/1/", "image_url": "https://img/1", "ignored": [1, 2]},
+    {"id": "2", "title": "B", "authors": [], "book_url": "https://other.example/book/2/"},
+    {"id": "3", "book_url": None},
+]
+RAW_PAGE = json.dumps({"books": RAW_BOOKS, "total_results": 42, "facets": {}}).encode()
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_decoded_book_records_match_parse_book(backend):
+    previous = set_json_decoder(JsonDecoder(backend))
+    try:
+        records, total_results = su.decode_book_records(RAW_PAGE)
+    finally:
+        set_json_decoder(previous)
+    assert total_results == 42
+    assert [su.book_record_to_dict(record) for record in records] == [
+        su.parse_books_details(book) for book in RAW_BOOKS]
+
+
+def test_books_batch_matches_parse_books_details():
+    columns = su.parse_books_batch(RAW_BOOKS)
+    assert list(columns) == list(su.BOOK_FIELDS)
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == [
+        su.parse_books_details(book) for book in RAW_BOOKS]
+
+
+LOOSE_PAGE = json.dumps({
+    "books": [{"id": 123, "price": 12.99, "publication_year": "2020", "num_authors": "2",
+               "authors": [{"name": "X"}], "book_url": "/en/book/123/"},
+              {"id": "456", "price": "9.99", "publication_year": 2021}],
+    "total_results": "5"}).encode()
+
+
+def test_backends_agree_on_loosely_typed_books():
+    decoded = []
+    for backend in available_backends():
+        previous = set_json_decoder(JsonDecoder(backend))
+        try:
+            records, total_results = su.decode_book_records(LOOSE_PAGE)
+        finally:
+            set_json_decoder(previous)
+        decoded.append(([su.book_record_to_dict(record) for record in records], total_results))
+    assert decoded[0][1] == 5
+    assert decoded[0][0][0]["book_id"] == 123
+    assert all(result == decoded[0] for result in decoded)
+
+
+def test_loosely_typed_page_is_fetched_once(fake_client, monkeypatch):
+    requested = []
+
+    def send(*args, **kwargs):
+        requested.append(None)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = LOOSE_PAGE
+        return response
+
+    monkeypatch.setattr(fake_client, "send", send)
+    assert su.fetch_books_page(1, 7).page_size == 2
+    assert len(requested) == 1
+
+
+def test_fetched_pages_hold_book_records(fake_client, monkeypatch):
+    monkeypatch.setattr(fake_client, "send", lambda *args, **kwargs: search_response(1))
+    books_page = su.fetch_books_page(1, 7)
+    assert (books_page.page_size, books_page.total_results) == (2, 6)
+    assert [book.book_id for book in books_page.books] == ["1-0", "1-1"]
+    assert books_page.books[0].book_url == "https://www.ebooks.com/en/book/0/"
+
+
+def test_fetch_books_data_returns_the_raw_books(fake_client, monkeypatch):
+    monkeypatch.setattr(fake_client, "send", lambda *args, **kwargs: search_response(1))
+    books_data = su.fetch_books_data(1, 7)
+    assert books_data[0] == {"id": "1-0", "title": "Book 0", "book_url": "/en/book/0/"}
+    assert su.parse_books_details(books_data[0])["book_url"] == "https://www.ebooks.com/en/book/0/"
+
+
+def test_async_crawl_requests_a_bounded_window_of_pages(catalog, monkeypatch):
+    catalog.add_subject(7, 200)
+
+    async def fetch_books_page(client, page_num, subject_id, rate_limiter=None):
+        await asyncio.sleep(0)
+        return catalog.fetch_books_page(page_num, subject_id)
+
+    monkeypatch.setattr(asu, "fetch_books_page", fetch_books_page)
+
+    async def crawl():
+        books = asu.iter_books(None, 7, concurrency=3)
+        book_ids = [(await books.__anext__())["book_id"] for _ in range(15)]
+        # The first page, then a window of three pages the consumer is still reading
+        assert len(catalog.requests) == 4
+        book_ids += [book["book_id"] async for book in books]
+        return book_ids
+
+    assert sorted(asyncio.run(crawl())) == sorted(f"7-{book_num}" for book_num in range(200))
+    assert len(catalog.requests) == 20
+
+
+def test_subjects_are_crawled_round_robin(catalog):
+    for subject_id, num_books in ((1, 35), (2, 15), (3, 25)):
+        catalog.add_subject(subject_id, num_books)
+    pages = [(books_page.subject_id, books_page.page_num)
+             for books_page in su.crawl_subjects([1, 2, 3, 1], max_workers=1)]
+    assert pages == [(1, 1), (2, 1), (3, 1), (1, 2), (2, 2), (3, 2), (1, 3), (3, 3), (1, 4)]
+    assert catalog.requests == pages
+
+
+def test_books_listed_under_several_subjects_are_emitted_once(catalog):
+    catalog.add_subject(1, 20, prefix="shared")
+    catalog.add_subject(2, 30, prefix="shared")
+    book_ids = [book_id for columns in su.iter_subjects_book_batches([1, 2])
+                for book_id in columns["book_id"]]
+    assert sorted(book_ids) == sorted(f"shared-{book_num}" for book_num in range(30))
+
+
+def test_category_topic_ids_cover_every_subject_once(monkeypatch):
+    topics = {1: {"Poetry": 10, "Drama": 11}, 2: {}, 3: {"Drama": 11, "Essays": 12}}
+    requested = []
+
+    def get_topics_for_subject(subject_id):
+        requested.append(subject_id)
+        return topics[subject_id]
+
+    monkeypatch.setattr(su, "get_topics_for_subject", get_topics_for_subject)
+    menu = su.SubjectMenu(
+        categories={"Literature": {"Poems and plays": 1, "Short stories": 2, "Prose": 3,
+                                   "Plays": 1}},
+        subject_ids={"Poems and plays": 1, "Short stories": 2, "Prose": 3, "Plays": 1})
+    assert menu.category_topic_ids("Literature") == [10, 11, 2, 12]
+    assert menu.category_topic_ids("Literature") == [10, 11, 2, 12]
+    assert sorted(requested) == [1, 2, 3]
+    assert menu.category_topic_ids("Unknown") == []